@@ -0,0 +1,195 @@
+import time
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from .models import User
+
+# Shared validator; JWTAuthentication keeps no per-request state
+jwt_auth = JWTAuthentication()
+
+# Custom claims carried by every token issued through get_tokens_for_user
+ROLE_CLAIM = 'role'
+TOKEN_VERSION_CLAIM = 'ver'
+
+
+class VerifiedTokenCache:
+    """
+    Small thread-safe LRU of raw token strings whose signature has already
+    been verified, so repeat requests skip decoding and HMAC checks.
+    Entries are dropped once the token's own `exp` has passed.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._tokens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, raw_token):
+        with self._lock:
+            claims = self._tokens.get(raw_token)
+            if claims is None:
+                return None
+            if claims.get('exp', 0) <= time.time():
+                del self._tokens[raw_token]
+                return None
+            self._tokens.move_to_end(raw_token)
+            return claims
+
+    def set(self, raw_token, claims):
+        with self._lock:
+            self._tokens[raw_token] = claims
+            self._tokens.move_to_end(raw_token)
+            while len(self._tokens) > self.maxsize:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+
+
+verified_tokens = VerifiedTokenCache(getattr(settings, 'VERIFIED_TOKEN_CACHE_SIZE', 1024))
+
+
+class TokenUser:
+    """
+    Caller authenticated from token claims alone.
+    `id` and `role` are enough for every RBAC check; any other User field is
+    loaded from the database on first access.
+    """
+
+    def __init__(self, user_id, role):
+        self.id = user_id
+        self.pk = user_id
+        self.role = role
+
+    @cached_property
+    def user(self):
+        return User.objects.get(id=self.id)
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set in __init__, e.g. name/email
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+    def __str__(self):
+        return f"User #{self.id} ({self.role})"
+
+
+def _token_version_key(user_id):
+    return f"accounts:token_version:{user_id}"
+
+def get_token_version(user_id):
+    """
+    Current token version of a user, served from the cache.
+    Deleted users resolve to -1 so none of their tokens match.
+    """
+    key = _token_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = User.objects.filter(id=user_id).values_list('token_version', flat=True).first()
+        if version is None:
+            version = -1
+        cache.set(key, version, getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 60))
+    return version
+
+def revoke_user_tokens(user_id):
+    """Invalidate every token issued to a user so far (role change, password change, deletion)"""
+    User.objects.filter(id=user_id).update(token_version=F('token_version') + 1)
+    cache.delete(_token_version_key(user_id))
+
+def is_token_current(token):
+    """Check a validated token's version against the user's current one"""
+    if TOKEN_VERSION_CLAIM not in token:
+        return True  # Issued before versioned tokens; nothing to compare against
+    return token[TOKEN_VERSION_CLAIM] == get_token_version(token.get('user_id'))
+
+# Helper function to generate tokens for a user
+def get_tokens_for_user(user):
+    """Generate JWT tokens for a user, carrying role and token version"""
+    refresh = RefreshToken.for_user(user)
+    refresh[ROLE_CLAIM] = user.role
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),  # Access token copies the custom claims
+    }
+
+# Helper function to get user from JWT token
+def get_user_from_token(request):
+    """Extract and validate JWT token from Authorization header"""
+    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not auth_header.startswith('Bearer '):
+        return None
+
+    token = auth_header.split(' ')[1]
+    claims = verified_tokens.get(token)
+    if claims is None:
+        try:
+            claims = jwt_auth.get_validated_token(token).payload
+        except (InvalidToken, TokenError):
+            return None
+        verified_tokens.set(token, claims)
+
+    user_id = claims.get('user_id')
+    if ROLE_CLAIM not in claims:
+        # Token issued before role claims existed; fall back to a lookup
+        try:
+            return User.objects.get(id=user_id)
+        except User.DoesNotExist:
+            return None
+    if not is_token_current(claims):
+        return None
+    return TokenUser(user_id, claims[ROLE_CLAIM])
+
+def get_user_from_session(request):
+    """Get user from the session keys set by the login views"""
+    if 'staff_id' in request.session:
+        try:
+            return User.objects.get(id=request.session['staff_id'], role__in=['Staff', 'Manager'])
+        except User.DoesNotExist:
+            return None
+    elif 'diner_id' in request.session:
+        try:
+            return User.objects.get(id=request.session['diner_id'], role='Customer')
+        except User.DoesNotExist:
+            return None
+    return None
+
+def resolve_current_user(request):
+    """
+    Resolve the caller from JWT token, falling back to session. A request
+    that sends a bearer token is judged by that token alone, so an expired
+    or revoked token isn't rescued by the session cookie.
+    """
+    if request.META.get('HTTP_AUTHORIZATION', '').startswith('Bearer '):
+        return get_user_from_token(request)
+    return get_user_from_session(request)
+
+def get_current_user(request):
+    """
+    Get currently logged-in user from token or session (fallback).
+    The result is cached on the request, so repeated calls within one
+    request cost no extra token validation or queries.
+    """
+    if not hasattr(request, '_cached_current_user'):
+        request._cached_current_user = resolve_current_user(request)
+    return request._cached_current_user
+
+def is_manager(user):
+    """Check if user is a Manager"""
+    return bool(user) and user.role == 'Manager'
+
+def is_staff(user):
+    """Check if user is Staff or Manager"""
+    return bool(user) and user.role in ['Staff', 'Manager']
+
+def is_customer(user):
+    """Check if user is a Customer"""
+    return bool(user) and user.role == 'Customer'
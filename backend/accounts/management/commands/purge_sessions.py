@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Deletes expired sessions from the database in small batches to avoid long table locks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Number of sessions deleted per statement (default: 1000)')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between chunks so other writers can get in (default: 0.1)')
+        parser.add_argument('--max-chunks', type=int, default=None,
+                            help='Stop after this many chunks; the rest is left for the next run')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        pause = options['pause']
+        max_chunks = options['max_chunks']
+        # Fixed cutoff, so sessions expiring while we run don't keep the loop going
+        cutoff = timezone.now()
+
+        total_deleted = 0
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            # Select keys first: each DELETE then only touches (and locks) one small batch of rows
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff)
+                .values_list('session_key', flat=True)[:chunk_size]
+            )
+            if not keys:
+                break
+            deleted, _ = Session.objects.filter(session_key__in=keys).delete()
+            total_deleted += deleted
+            chunks += 1
+            self.stdout.write(f'Deleted {deleted} expired sessions (chunk {chunks})')
+            if len(keys) < chunk_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        self.stdout.write(self.style.SUCCESS(f'Purged {total_deleted} expired sessions.'))
@@ -0,0 +1,23 @@
+from .auth import get_token_version
+
+
+class SessionTokenVersionMiddleware:
+    """
+    End login sessions whose user has had their tokens revoked.
+
+    The login views store the user's token version in the session next to
+    staff_id / diner_id. Revoking tokens (password or role change, deletion)
+    bumps the version, so the session is flushed on its next request instead
+    of outliving the JWTs issued with it. Views that read the session keys
+    directly are covered too, because this runs before them.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        session = request.session
+        user_id = session.get('staff_id') or session.get('diner_id')
+        if user_id is not None and session.get('token_version') != get_token_version(user_id):
+            session.flush()
+        return self.get_response(request)
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_token_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['name', 'role'], name='accounts_user_name_role_idx'),
+        ),
+    ]
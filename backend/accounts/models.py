@@ -14,6 +14,13 @@ class User(models.Model):
     phone_num = models.CharField(max_length=20, blank=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, blank=False, null=False)
     time_created = models.DateTimeField(auto_now_add=True)
+    token_version = models.PositiveIntegerField(default=0)  # Bumped to revoke issued JWTs
+
+    class Meta:
+        indexes = [
+            # Login lookups filter by name within a set of roles
+            models.Index(fields=['name', 'role'], name='accounts_user_name_role_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.role})"
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from .models import User
+
+
+class PasswordVerifierBusy(Exception):
+    """Raised when the hashing pool and its queue are full"""
+
+
+class PasswordVerifier:
+    """
+    Runs password checks on a dedicated, size-limited thread pool.
+
+    PBKDF2 releases the GIL while hashing, so capping the pool caps how many
+    cores login traffic can take from the request workers. At most
+    `max_workers + max_queue` checks are admitted at once; anything beyond
+    that is rejected immediately instead of piling up behind the pool.
+    """
+
+    def __init__(self, max_workers, max_queue, timeout):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-verify')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+
+    def verify(self, raw_password, encoded):
+        """
+        Return (is_correct, new_encoded). `new_encoded` is a fresh hash when
+        the stored one uses outdated hasher settings, otherwise None.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise PasswordVerifierBusy()
+        try:
+            future = self._executor.submit(_check_and_rehash, raw_password, encoded)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise PasswordVerifierBusy()
+
+
+def _check_and_rehash(raw_password, encoded):
+    """Runs on the pool. Rehashing happens here too, since make_password is just as costly."""
+    rehashed = []
+    is_correct = check_password(raw_password, encoded, setter=lambda raw: rehashed.append(make_password(raw)))
+    return is_correct, (rehashed[0] if rehashed else None)
+
+
+password_verifier = PasswordVerifier(
+    max_workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 2),
+    max_queue=getattr(settings, 'PASSWORD_HASH_QUEUE', 8),
+    timeout=getattr(settings, 'PASSWORD_HASH_TIMEOUT', 5),
+)
+
+def verify_user_password(user, raw_password):
+    """
+    Check a user's password on the hashing pool.
+    Stored hashes made with outdated iteration counts are upgraded in place.
+    Raises PasswordVerifierBusy when the pool is saturated.
+    """
+    is_correct, new_encoded = password_verifier.verify(raw_password, user.hashed_password)
+    if is_correct and new_encoded:
+        user.hashed_password = new_encoded
+        User.objects.filter(id=user.id).update(hashed_password=new_encoded)
+    return is_correct
+
+
+# Login attempt counters, kept in the shared cache so all workers see them
+
+def _attempt_keys(username, ip):
+    # Usernames may contain spaces and non-ASCII characters, which some cache backends reject
+    username_digest = hashlib.sha256((username or '').encode()).hexdigest()[:32]
+    return f"accounts:login_attempts:user:{username_digest}", f"accounts:login_attempts:ip:{ip}"
+
+def _increment(key, window):
+    # add() is a no-op when the key exists, so the window starts at the first failure
+    cache.add(key, 0, window)
+    try:
+        return cache.incr(key)
+    except ValueError:  # Expired between add() and incr()
+        cache.set(key, 1, window)
+        return 1
+
+def get_client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+def login_attempts_exceeded(username, ip):
+    """Check whether this username or client IP has used up its failed-login budget"""
+    user_key, ip_key = _attempt_keys(username, ip)
+    counts = cache.get_many([user_key, ip_key])
+    return (counts.get(user_key, 0) >= getattr(settings, 'LOGIN_MAX_ATTEMPTS_PER_USER', 10)
+            or counts.get(ip_key, 0) >= getattr(settings, 'LOGIN_MAX_ATTEMPTS_PER_IP', 50))
+
+def record_failed_login(username, ip):
+    window = getattr(settings, 'LOGIN_ATTEMPT_WINDOW', 300)
+    for key in _attempt_keys(username, ip):
+        _increment(key, window)
+
+def reset_login_attempts(username):
+    user_key, _ = _attempt_keys(username, '')
+    cache.delete(user_key)
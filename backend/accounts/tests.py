@@ -0,0 +1,107 @@
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from .auth import revoke_user_tokens
+from .models import User
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-default'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'test-sessions'},
+}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES,
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    SESSION_CACHE_ALIAS='sessions',
+)
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        caches['sessions'].clear()
+        self.SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def test_session_read_after_write_is_served_from_cache(self):
+        session = self.SessionStore()
+        session['diner_id'] = 42
+        session.save()
+        # Written through to the database as well
+        self.assertTrue(Session.objects.filter(session_key=session.session_key).exists())
+
+        with self.assertNumQueries(0):
+            loaded = self.SessionStore(session_key=session.session_key)
+            self.assertEqual(loaded['diner_id'], 42)
+
+    def test_session_falls_back_to_database_on_cache_miss(self):
+        session = self.SessionStore()
+        session['diner_id'] = 7
+        session.save()
+        caches['sessions'].clear()
+
+        with self.assertNumQueries(1):
+            loaded = self.SessionStore(session_key=session.session_key)
+            self.assertEqual(loaded['diner_id'], 7)
+
+
+class PurgeSessionsTests(TestCase):
+    def make_sessions(self, count, expire_date, prefix):
+        Session.objects.bulk_create(
+            Session(session_key=f'{prefix}{i:035d}', session_data='', expire_date=expire_date)
+            for i in range(count)
+        )
+
+    def setUp(self):
+        now = timezone.now()
+        self.make_sessions(5, now - timedelta(days=1), 'e')
+        self.make_sessions(3, now + timedelta(days=1), 'l')
+
+    def test_deletes_expired_sessions_in_chunks(self):
+        out = StringIO()
+        call_command('purge_sessions', chunk_size=2, pause=0, stdout=out)
+
+        self.assertFalse(Session.objects.filter(expire_date__lt=timezone.now()).exists())
+        self.assertEqual(Session.objects.count(), 3)
+        output = out.getvalue()
+        self.assertIn('Deleted 2 expired sessions (chunk 1)', output)
+        self.assertIn('Deleted 1 expired sessions (chunk 3)', output)
+        self.assertIn('Purged 5 expired sessions.', output)
+
+    def test_max_chunks_leaves_the_rest_for_the_next_run(self):
+        call_command('purge_sessions', chunk_size=2, pause=0, max_chunks=1, stdout=StringIO())
+
+        self.assertEqual(Session.objects.filter(expire_date__lt=timezone.now()).count(), 3)
+        self.assertEqual(Session.objects.filter(expire_date__gte=timezone.now()).count(), 3)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['sessions'].clear()
+        self.diner = User(name='diner', role='Customer', email='diner@example.com')
+        self.diner.set_password('secret')
+        self.diner.save()
+        self.client = Client()
+        response = self.client.post('/api/accounts/diner/login/', {'username': 'diner', 'password': 'secret'})
+        self.access = response.json()['access']
+
+    def test_revoking_tokens_ends_the_session(self):
+        self.assertEqual(self.client.get('/api/accounts/protected/').status_code, 200)
+        revoke_user_tokens(self.diner.id)
+
+        self.assertEqual(self.client.get('/api/accounts/protected/').status_code, 401)
+        self.assertNotIn('diner_id', self.client.session)
+
+    def test_revoked_token_does_not_fall_back_to_the_session(self):
+        revoke_user_tokens(self.diner.id)
+        # Log in again on the same client: the session is valid, the old token is not
+        self.client.post('/api/accounts/diner/login/', {'username': 'diner', 'password': 'secret'})
+
+        response = self.client.get('/api/accounts/protected/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(self.client.get('/api/accounts/protected/').status_code, 200)
@@ -2,70 +2,47 @@ from django.shortcuts import render, redirect
 from django.http import HttpRequest, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from .models import User
+from .auth import get_tokens_for_user, get_user_from_token, get_current_user, is_manager, is_staff, is_customer
+from .auth import is_token_current, revoke_user_tokens
+from .passwords import (PasswordVerifierBusy, verify_user_password, get_client_ip,
+                        login_attempts_exceeded, record_failed_login, reset_login_attempts)
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 import jwt
 from django.conf import settings
 
-# Helper function to generate tokens for a user
-def get_tokens_for_user(user):
-    """Generate JWT tokens for a user"""
-    refresh = RefreshToken.for_user(user)
-    return {
-        'refresh': str(refresh),
-        'access': str(refresh.access_token),
-    }
+def check_login(request, username, password, roles):
+    """
+    Look up a user by name within the given roles and verify the password on
+    the hashing pool. Returns (user, None) on success or (None, JsonResponse)
+    describing the rejection.
+    """
+    ip = get_client_ip(request)
+    if login_attempts_exceeded(username, ip):
+        return None, too_many_requests('Too many failed login attempts. Try again later.')
 
-# Helper function to get user from JWT token
-def get_user_from_token(request):
-    """Extract and validate JWT token from Authorization header"""
-    auth_header = request.META.get('HTTP_AUTHORIZATION', '')
-    if not auth_header.startswith('Bearer '):
-        return None
-    
-    token = auth_header.split(' ')[1]
     try:
-        jwt_auth = JWTAuthentication()
-        validated_token = jwt_auth.get_validated_token(token)
-        user_id = validated_token.get('user_id')
-        user = User.objects.get(id=user_id)
-        return user
-    except (InvalidToken, TokenError, User.DoesNotExist):
-        return None
+        user = User.objects.get(name=username, role__in=roles)
+    except User.DoesNotExist:
+        record_failed_login(username, ip)
+        return None, JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
 
-# Authorization helper functions (updated to support both session and token)
-def get_current_user(request):
-    """Get currently logged-in user from token or session (fallback)"""
-    # First try to get user from JWT token
-    user = get_user_from_token(request)
-    if user:
-        return user
-    
-    # Fallback to session-based auth for backward compatibility
-    if 'staff_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['staff_id'], role__in=['Staff', 'Manager'])
-        except User.DoesNotExist:
-            return None
-    elif 'diner_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['diner_id'], role='Customer')
-        except User.DoesNotExist:
-            return None
-    return None
+    try:
+        is_correct = verify_user_password(user, password)
+    except PasswordVerifierBusy:
+        return None, too_many_requests('Login service is busy. Try again shortly.')
 
-def is_manager(user):
-    """Check if user is a Manager"""
-    return user and user.role == 'Manager'
+    if not is_correct:
+        record_failed_login(username, ip)
+        return None, JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
 
-def is_staff(user):
-    """Check if user is Staff or Manager"""
-    return user and user.role in ['Staff', 'Manager']
+    reset_login_attempts(username)
+    return user, None
 
-def is_customer(user):
-    """Check if user is a Customer"""
-    return user and user.role == 'Customer'
+def too_many_requests(message):
+    response = JsonResponse({'success': False, 'error': message}, status=429)
+    response['Retry-After'] = str(getattr(settings, 'LOGIN_RETRY_AFTER', 5))
+    return response
 
 @csrf_exempt  # For testing; handle CSRF properly in production
 def staff_login(request: HttpRequest) -> JsonResponse:
@@ -84,17 +61,14 @@ def staff_login(request: HttpRequest) -> JsonResponse:
         if not username or not password:
             return JsonResponse({'success': False, 'error': 'Username and password required'}, status=400)
 
-        try:
-            staff = User.objects.get(name=username, role__in=['Staff', 'Manager'])
-        except User.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
-
-        if staff.check_password(password):
+        staff, error_response = check_login(request, username, password, ['Staff', 'Manager'])
+        if staff:
             # Generate JWT tokens
             tokens = get_tokens_for_user(staff)
             
             # Also set session for backward compatibility
             request.session['staff_id'] = staff.id
+            request.session['token_version'] = staff.token_version  # Revoking tokens ends the session too
             
             return JsonResponse({
                 'success': True,
@@ -108,7 +82,7 @@ def staff_login(request: HttpRequest) -> JsonResponse:
                 }
             })
         else:
-            return JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
+            return error_response
 
     return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
@@ -120,17 +94,17 @@ def diner_login(request: HttpRequest) -> JsonResponse:
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
-        try:
-            diner = User.objects.get(name=username, role='Customer')
-        except User.DoesNotExist:
+        if not username or not password:
             return JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
-        
-        if diner.check_password(password):
+
+        diner, error_response = check_login(request, username, password, ['Customer'])
+        if diner:
             # Generate JWT tokens
             tokens = get_tokens_for_user(diner)
             
             # Also set session for backward compatibility
             request.session['diner_id'] = diner.id
+            request.session['token_version'] = diner.token_version  # Revoking tokens ends the session too
             
             return JsonResponse({
                 'success': True,
@@ -145,7 +119,7 @@ def diner_login(request: HttpRequest) -> JsonResponse:
                 }
             })
         else:
-            return JsonResponse({'success': False, 'error': 'Invalid credentials'}, status=400)
+            return error_response
     return JsonResponse({'error': 'Only POST allowed'}, status=405)
 
 @csrf_exempt
@@ -200,6 +174,9 @@ def refresh_token(request: HttpRequest) -> JsonResponse:
         
         try:
             refresh = RefreshToken(refresh_token_str)
+            # Role change, password change or deletion revokes refresh tokens too
+            if not is_token_current(refresh):
+                return JsonResponse({'error': 'Invalid or expired refresh token'}, status=401)
             return JsonResponse({
                 'access': str(refresh.access_token),
             }, status=200)
@@ -309,6 +286,7 @@ def delete_accounts(request: HttpRequest) -> JsonResponse:
             user_to_delete = User.objects.get(id=user_id)
             user_name = user_to_delete.name
             user_to_delete.delete()
+            revoke_user_tokens(user_id)
             return JsonResponse({"status": "success", "message": f"User '{user_name}' deleted successfully"}, status=200)
         except User.DoesNotExist:
             return JsonResponse({"status": "error", "message": "User not found"}, status=404)
@@ -338,6 +316,8 @@ def update_roles(request: HttpRequest) -> JsonResponse:
             old_role = user_to_update.role
             user_to_update.role = new_role
             user_to_update.save()
+            if old_role != new_role:
+                revoke_user_tokens(user_to_update.id)  # Tokens still carry the old role
             return JsonResponse({
                 "status": "success",
                 "message": f"Role updated from {old_role} to {new_role}",
@@ -386,34 +366,20 @@ def update_user_info(request: HttpRequest) -> JsonResponse:
     Update user information.
     RBAC: Customer and Staff can update own info, Manager can update any user.
     """
-    print(f"[update_user_info] VIEW CALLED! Method: {request.method}")
-    print(f"[update_user_info] Headers: {dict(request.headers)}")
-    print(f"[update_user_info] POST data: {request.POST}")
-    
     if request.method == "POST":
         current_user = get_current_user(request)
-        print(f"[update_user_info] current_user from get_current_user: {current_user}")
-        
         if not current_user:
-            print(f"[update_user_info] No current_user - returning 401")
             return JsonResponse({"status": "error", "message": "Authentication required"}, status=401)
         
-        print(f"[update_user_info] current_user: {current_user.name}, role: {current_user.role}, id: {current_user.id}")
-        
         user_id = request.POST.get("user_id")
         if not user_id:
             return JsonResponse({"status": "error", "message": "Missing required field: user_id"}, status=400)
         
-        print(f"[update_user_info] user_id to update: {user_id}")
-        print(f"[update_user_info] is_customer: {is_customer(current_user)}, is_staff: {is_staff(current_user)}, is_manager: {is_manager(current_user)}")
-        
         # RBAC: Customer and Staff can update own info, Manager can update any user
         if is_customer(current_user) or is_staff(current_user):
             if str(current_user.id) != str(user_id):
-                print(f"[update_user_info] Unauthorized: current_user.id ({current_user.id}) != user_id ({user_id})")
                 return JsonResponse({"status": "error", "message": "Unauthorized: Can only update own information"}, status=403)
         elif not is_manager(current_user):
-            print(f"[update_user_info] Unauthorized: not a manager")
             return JsonResponse({"status": "error", "message": "Unauthorized access"}, status=403)
         
         try:
@@ -443,6 +409,8 @@ def update_user_info(request: HttpRequest) -> JsonResponse:
             user.set_password(password)
         
         user.save()
+        if password:
+            revoke_user_tokens(user.id)
         return JsonResponse({
             "status": "success",
             "message": "User information updated successfully",
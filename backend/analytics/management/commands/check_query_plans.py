@@ -0,0 +1,99 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from accounts.models import User
+from orders.models import Order
+from reviews.models import Feedback
+from datetime import timedelta
+import random
+
+
+class Command(BaseCommand):
+    help = 'Checks that the hot order, feedback and login queries are planned with their indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed-orders', type=int, default=0,
+                            help='Insert this many synthetic orders first (e.g. 1000000). Use on a scratch database only.')
+        parser.add_argument('--batch-size', type=int, default=10_000,
+                            help='Rows per bulk insert when seeding (default: 10000)')
+
+    def handle(self, *args, **options):
+        if options['seed_orders']:
+            self.seed_orders(options['seed_orders'], options['batch_size'])
+
+        # Refresh planner statistics so the plans reflect the current data
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        now = timezone.now()
+        month_ago = now - timedelta(days=30)
+        diner_id = User.objects.filter(role='Customer').values_list('id', flat=True).first() or 0
+
+        kitchen_indexes = ['orders_kitchen_active_idx', 'orders_status_created_idx']
+        if connection.vendor == 'sqlite':
+            # SQLite cannot match bound parameters against a partial index
+            # predicate, so it walks the time_created index under the LIMIT
+            kitchen_indexes.append('orders_created_id_idx')
+
+        # (description, queryset, index names any of which satisfies the check)
+        hot_queries = [
+            ("Kitchen board (get_kitchen_orders)",
+             Order.objects.filter(status__in=Order.KITCHEN_STATUSES).order_by('time_created')[:100],
+             kitchen_indexes),
+            ("Order date range (analytics views)",
+             Order.objects.filter(time_created__range=(month_ago, now)).values('id', 'total_price'),
+             ['orders_created_id_idx']),
+            ("All orders page (get_all_orders)",
+             Order.objects.order_by('-time_created', '-id')[:50],
+             ['orders_created_id_idx']),
+            ("Diner order history (get_diner_orders)",
+             Order.objects.filter(diner_id=diner_id).order_by('-time_created'),
+             ['orders_diner_created_idx']),
+            ("Feedback date range (get_rating_analytics)",
+             Feedback.objects.filter(time_created__range=(month_ago, now)).values_list('rating', flat=True),
+             ['reviews_feedback_created_idx']),
+            ("Login lookup (staff_login/diner_login)",
+             User.objects.filter(name='Guy Fieri', role__in=['Staff', 'Manager']),
+             ['accounts_user_name_role_idx']),
+        ]
+
+        failures = []
+        for description, queryset, index_names in hot_queries:
+            plan = queryset.explain()
+            used = [name for name in index_names if name in plan]
+            if used:
+                self.stdout.write(self.style.SUCCESS(f'OK   {description}: uses {used[0]}'))
+            else:
+                failures.append(description)
+                self.stdout.write(self.style.ERROR(f'MISS {description}: expected one of {", ".join(index_names)}'))
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries are not using their indexes')
+        self.stdout.write(self.style.SUCCESS('All hot queries use their indexes.'))
+
+    def seed_orders(self, count, batch_size):
+        diner_ids = list(User.objects.filter(role='Customer').values_list('id', flat=True))
+        if not diner_ids:
+            raise CommandError('Seeding orders needs at least one Customer; run seed_db first')
+
+        self.stdout.write(self.style.WARNING(f'Inserting {count} synthetic orders...'))
+        end = timezone.now()
+        span_seconds = int(timedelta(days=365).total_seconds())
+        # Mostly settled orders, with a thin slice still on the kitchen board
+        statuses = ['COMPLETED'] * 97 + ['CANCELLED'] * 2 + ['PENDING']
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            Order.objects.bulk_create([
+                Order(
+                    service_type='Dine-In',
+                    diner_id=random.choice(diner_ids),
+                    status=random.choice(statuses),
+                    total_price=random.randint(5, 100) * 10000,
+                    time_created=end - timedelta(seconds=random.randint(0, span_seconds)),
+                )
+                for _ in range(size)
+            ], batch_size=size)
+            created += size
+        self.stdout.write(self.style.SUCCESS(f'Inserted {created} orders.'))
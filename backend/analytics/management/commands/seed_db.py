@@ -6,6 +6,7 @@ from accounts.models import User
 from menu.models import Menu, MenuItem
 from orders.models import Order, OrderItem, Payment
 from reviews.models import Feedback
+from menu.images import suspend_variant_generation
 from django.utils.timezone import make_aware
 from datetime import datetime, timedelta
 import random
@@ -20,6 +21,13 @@ class Command(BaseCommand):
     help = 'Seeds the database with initial data if it is empty'
 
     def handle(self, *args, **kwargs):
+        # Seeded images are resized by generate_menu_image_variants rather than
+        # on every container start, where the background threads contend for
+        # the database with the seeding itself
+        with suspend_variant_generation():
+            self.seed()
+
+    def seed(self):
         database_seeding = os.getenv('DATABASE_SEEDING', 'False').lower() in ['true', '1', 't']
         
         if database_seeding:
@@ -121,22 +129,22 @@ class Command(BaseCommand):
             
             # Example seeding for Order and OrderItem
             order_k = Order.objects.create(service_type="Dine-In", diner=diner_khanh, status='PENDING', note='Cho em ít hành với ạ', total_price=390000)
-            order_item_k_carbonara = OrderItem.objects.create(order=order_k, menu_item=menu_item_carbonara_tteokbokki, quantity=2)
-            order_item_k_special = OrderItem.objects.create(order=order_k, menu_item=menu_item_tra_hoa_qua_dac_biet, quantity=1)
+            order_item_k_carbonara = OrderItem.objects.create(order=order_k, menu_item=menu_item_carbonara_tteokbokki, quantity=2, unit_price=menu_item_carbonara_tteokbokki.price, item_name=menu_item_carbonara_tteokbokki.name)
+            order_item_k_special = OrderItem.objects.create(order=order_k, menu_item=menu_item_tra_hoa_qua_dac_biet, quantity=1, unit_price=menu_item_tra_hoa_qua_dac_biet.price, item_name=menu_item_tra_hoa_qua_dac_biet.name)
             
             order_b = Order.objects.create(service_type="Dine-In", diner=diner_binh, status='PENDING', note='', total_price=280000)
-            order_item_b_com_tron = OrderItem.objects.create(order=order_b, menu_item=menu_item_com_tron_bibimbap, quantity=1)
-            order_item_b_mien_tron = OrderItem.objects.create(order=order_b, menu_item=menu_item_mien_tron, quantity=1)
+            order_item_b_com_tron = OrderItem.objects.create(order=order_b, menu_item=menu_item_com_tron_bibimbap, quantity=1, unit_price=menu_item_com_tron_bibimbap.price, item_name=menu_item_com_tron_bibimbap.name)
+            order_item_b_mien_tron = OrderItem.objects.create(order=order_b, menu_item=menu_item_mien_tron, quantity=1, unit_price=menu_item_mien_tron.price, item_name=menu_item_mien_tron.name)
             
             order_messi = Order.objects.create(service_type="Dine-In", diner=diner_messi, status='COMPLETED', note='I would like less ice in my drinks', total_price=710000)
-            order_item_messi_ram_don = OrderItem.objects.create(order=order_messi, menu_item=menu_item_ram_don, quantity=3)
-            order_item_messi_kimbap = OrderItem.objects.create(order=order_messi, menu_item=menu_item_kimbap_xa_xiu, quantity=2)
-            order_item_messi_tra = OrderItem.objects.create(order=order_messi, menu_item=menu_item_tra_kiwi_hoa_com_chay, quantity=1)
+            order_item_messi_ram_don = OrderItem.objects.create(order=order_messi, menu_item=menu_item_ram_don, quantity=3, unit_price=menu_item_ram_don.price, item_name=menu_item_ram_don.name)
+            order_item_messi_kimbap = OrderItem.objects.create(order=order_messi, menu_item=menu_item_kimbap_xa_xiu, quantity=2, unit_price=menu_item_kimbap_xa_xiu.price, item_name=menu_item_kimbap_xa_xiu.name)
+            order_item_messi_tra = OrderItem.objects.create(order=order_messi, menu_item=menu_item_tra_kiwi_hoa_com_chay, quantity=1, unit_price=menu_item_tra_kiwi_hoa_com_chay.price, item_name=menu_item_tra_kiwi_hoa_com_chay.name)
             
             order_mbappe = Order.objects.create(service_type="Takeout", diner=diner_mbappe, status='COMPLETED', note='Extra spicy, please!', total_price=380000)
-            order_item_mbappe_tteokbokki = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_tteokbokki_cha_ca, quantity=1)
-            order_item_mbappe_kimbap = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_kimbap_bo_bulgogi, quantity=1)
-            order_item_mbappe_tra = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_tra_sua_gao_nho, quantity=2)
+            order_item_mbappe_tteokbokki = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_tteokbokki_cha_ca, quantity=1, unit_price=menu_item_tteokbokki_cha_ca.price, item_name=menu_item_tteokbokki_cha_ca.name)
+            order_item_mbappe_kimbap = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_kimbap_bo_bulgogi, quantity=1, unit_price=menu_item_kimbap_bo_bulgogi.price, item_name=menu_item_kimbap_bo_bulgogi.name)
+            order_item_mbappe_tra = OrderItem.objects.create(order=order_mbappe, menu_item=menu_item_tra_sua_gao_nho, quantity=2, unit_price=menu_item_tra_sua_gao_nho.price, item_name=menu_item_tra_sua_gao_nho.name)
             
             # Seeding more example orders
             end_date = datetime(2026, 1, 31, 23, 59, 59)
@@ -223,7 +231,9 @@ class Command(BaseCommand):
                     item = OrderItem(
                         order=order,
                         menu_item=item_data['menu_item'],
-                        quantity=item_data['quantity']
+                        quantity=item_data['quantity'],
+                        unit_price=item_data['menu_item'].price,
+                        item_name=item_data['menu_item'].name
                     )
                     list_generated_orderitems.append(item)
                     
@@ -1,9 +1,9 @@
 from django.http import JsonResponse, HttpRequest
 from django.views.decorators.csrf import csrf_exempt
 from datetime import datetime
-from django.db.models import Sum
+from django.db.models import Sum, F
 from reviews.models import Feedback  # Assumes the Feedback model is in the reviews app
-from orders.models import Order, OrderItem
+from orders.models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
 from collections import Counter
 from django.db.models.functions import TruncMonth
 
@@ -18,7 +18,7 @@ def get_rating_analytics(request: HttpRequest) -> JsonResponse:
     if request.method != "GET":
         return JsonResponse({"status": "error", "message": "Invalid HTTP method"}, status=405)
     
-    from accounts.views import get_current_user, is_staff
+    from accounts.auth import get_current_user, is_staff
     current_user = get_current_user(request)
     
     if not current_user:
@@ -66,7 +66,7 @@ def get_revenue_analytics(request: HttpRequest) -> JsonResponse:
     if request.method != "GET":
         return JsonResponse({"status": "error", "message": "Invalid HTTP method"}, status=405)
     
-    from accounts.views import get_current_user, is_staff
+    from accounts.auth import get_current_user, is_staff
     current_user = get_current_user(request)
     
     if not current_user:
@@ -90,20 +90,23 @@ def get_revenue_analytics(request: HttpRequest) -> JsonResponse:
             "message": "Invalid datetime format, use YYYY-MM-DD HH:MM:SS"
         }, status=400)
     
-    orders = Order.objects.filter(time_created__range=(start_dt, end_dt))
-    # Group orders by month and sum total_price for each month
-
-    monthly_revenue = (
-        orders.annotate(month=TruncMonth('time_created'))
-        .values('month')
-        .annotate(total_revenue=Sum('total_price'))
-        .order_by('month')
-    )
+    # Group orders by month and sum total_price for each month, over live and archived orders
+    revenue_by_month = {}
+    for model in (Order, ArchivedOrder):
+        monthly_revenue = (
+            model.objects.filter(time_created__range=(start_dt, end_dt))
+            .annotate(month=TruncMonth('time_created'))
+            .values('month')
+            .annotate(total_revenue=Sum('total_price'))
+        )
+        for m in monthly_revenue:
+            month = m["month"].strftime("%Y-%m")
+            revenue_by_month[month] = revenue_by_month.get(month, 0) + (m["total_revenue"] or 0)
     monthly_revenue_list = [
-        {"month": m["month"].strftime("%Y-%m"), "total_revenue": m["total_revenue"] or 0}
-        for m in monthly_revenue
+        {"month": month, "total_revenue": revenue}
+        for month, revenue in sorted(revenue_by_month.items())
     ]
-    total_revenue = orders.aggregate(total_revenue=Sum('total_price'))["total_revenue"] or 0
+    total_revenue = sum(revenue_by_month.values())
     
     return JsonResponse({"status": "success", "total_revenue": total_revenue, "monthly_revenue": monthly_revenue_list})
 
@@ -113,13 +116,14 @@ def get_menu_items_order_count(request: HttpRequest) -> JsonResponse:
     """
     Returns the count of ordered menu items within a given time range.
     Expects 'start' and 'end' query parameters in the format 'YYYY-MM-DD HH:MM:SS'.
-    Returns a list of menu item names and their total order quantities.
+    Returns a list of menu item names and their total order quantities and revenue,
+    at the prices the items were ordered at.
     Supports both JWT and session authentication.
     """
     if request.method != "GET":
         return JsonResponse({"status": "error", "message": "Invalid HTTP method"}, status=405)
     
-    from accounts.views import get_current_user, is_staff
+    from accounts.auth import get_current_user, is_staff
     current_user = get_current_user(request)
     
     if not current_user:
@@ -143,9 +147,22 @@ def get_menu_items_order_count(request: HttpRequest) -> JsonResponse:
             "message": "Invalid datetime format, use YYYY-MM-DD HH:MM:SS"
         }, status=400)
     
-    order_items = OrderItem.objects.filter(order__time_created__range=(start_dt, end_dt))
-    counts = order_items.values("menu_item__id").annotate(order_count=Sum("quantity"))
-    result = list(counts)
+    order_counts = {}
+    revenues = {}
+    # Lines of deleted menu items have no menu item and are counted under null
+    for model in (OrderItem, ArchivedOrderItem):
+        order_items = model.objects.filter(order__time_created__range=(start_dt, end_dt))
+        rows = order_items.values("menu_item_id").annotate(
+            order_count=Sum("quantity"), revenue=Sum(F("quantity") * F("unit_price"))
+        )
+        for row in rows:
+            menu_item_id = row["menu_item_id"]
+            order_counts[menu_item_id] = order_counts.get(menu_item_id, 0) + row["order_count"]
+            revenues[menu_item_id] = revenues.get(menu_item_id, 0) + (row["revenue"] or 0)
+    result = [
+        {"menu_item__id": menu_item_id, "order_count": count, "revenue": revenues[menu_item_id]}
+        for menu_item_id, count in order_counts.items()
+    ]
     
     return JsonResponse({"status": "success", "menu_items_order_count": result})
 
@@ -0,0 +1,116 @@
+import os
+import re
+import mimetypes
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import Http404, HttpResponse, FileResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .storage import is_hashed_name
+
+# Media files are served by this view instead of django.views.static.serve,
+# which sends no caching headers and doesn't support ranges.
+#
+# Content-hashed files never change and are cached by clients for a year;
+# other files (seeded images, the demo QR code) are revalidated after an
+# hour. With MEDIA_SENDFILE_HEADER set, the view only checks the request and
+# hands the file over to the web server (nginx X-Accel-Redirect, Apache or
+# lighttpd X-Sendfile) instead of streaming it from Python.
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, max-age=3600"
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single-range "bytes=" header, end inclusive; None to
+    send the whole file (no header, or several ranges); raises ValueError
+    for a range outside the file.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(size - int(last), 0), size - 1  # Suffix range: the last N bytes
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+def iter_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+def serve_media(request, path):
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponse(status=405)
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404("Media file not found")
+    if not os.path.isfile(full_path):
+        raise Http404("Media file not found")
+
+    if is_hashed_name(path):
+        etag = quote_etag(os.path.splitext(os.path.basename(path))[0])
+        cache_control = IMMUTABLE_CACHE_CONTROL
+    else:
+        etag = quote_etag(f"{int(stat.st_mtime * 1_000_000):x}-{stat.st_size:x}")
+        cache_control = MUTABLE_CACHE_CONTROL
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = _file_response(request, path, full_path, stat.st_size, etag)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = cache_control
+    return response
+
+def _file_response(request, path, full_path, size, etag):
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    sendfile_header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if sendfile_header:
+        # The web server sends the file and answers Range requests itself
+        response = HttpResponse(content_type=content_type)
+        if sendfile_header.lower() == 'x-accel-redirect':
+            response[sendfile_header] = getattr(settings, 'MEDIA_SENDFILE_PREFIX', '/protected-media/') + path
+        else:
+            response[sendfile_header] = full_path
+        return response
+
+    byte_range = None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    # With a mismatched If-Range the client's partial copy is of another version; send it all
+    if if_range is None or if_range == etag:
+        try:
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    if byte_range is None:
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(iter_range(open(full_path, 'rb'), start, end - start + 1),
+                                         status=206, content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = str(end - start + 1)
+    response["Accept-Ranges"] = "bytes"
+    return response
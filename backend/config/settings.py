@@ -18,6 +18,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are named by content hash, so identical files are stored once and
+# can be cached forever (config.storage). Unreferenced files are removed by
+# `python manage.py gc_media`.
+STORAGES = {
+    'default': {'BACKEND': 'config.storage.HashedFileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Let the web server send media files: 'X-Accel-Redirect' (nginx, with an
+# internal location at MEDIA_SENDFILE_PREFIX aliased to MEDIA_ROOT) or
+# 'X-Sendfile' (Apache mod_xsendfile, lighttpd). None streams them from Django.
+MEDIA_SENDFILE_HEADER = None
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
@@ -27,6 +40,11 @@ SECRET_KEY = 'django-insecure-0s0eazz9%ry4xxq(#u0k4!rxz-ya4hite-p2kmy0as6c99lu8^
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Whether Django answers MEDIA_URL itself (config.media). Like static(), that
+# is for development only, unless MEDIA_SENDFILE_HEADER hands the sending to
+# the web server. Otherwise serve MEDIA_ROOT from the web server directly.
+SERVE_MEDIA = DEBUG or bool(MEDIA_SENDFILE_HEADER)
+
 ALLOWED_HOSTS = []
 
 
@@ -57,6 +75,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.middleware.SessionTokenVersionMiddleware',  # Ends sessions of users whose tokens were revoked
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,8 +94,16 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'idempotency-key',
 ]
 
+# Sessions are read from the cache and written through to the database, so the
+# session lookup on every request stops hitting django_session. Use
+# 'django.contrib.sessions.backends.db' to go back to database-only sessions.
+# Expired rows are removed with `python manage.py purge_sessions`.
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
 SESSION_COOKIE_SAMESITE = 'Lax'     # or 'None' if using HTTPS
 SESSION_COOKIE_SECURE = False      # switch to True in production HTTPS
 CSRF_COOKIE_SAMESITE = 'Lax'
@@ -196,3 +223,66 @@ SIMPLE_JWT = {
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
+
+# Verified-token LRU size (per process) used by accounts.auth
+VERIFIED_TOKEN_CACHE_SIZE = 1024
+# How long a user's token version is cached before re-reading it from the DB.
+# Revocations clear the entry immediately in the shared cache; with the default
+# per-process cache, other workers pick them up within this many seconds.
+TOKEN_VERSION_CACHE_TIMEOUT = 60
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Login attempt counters and token versions live here. Point this at a shared
+# backend (e.g. Redis or Memcached) when running more than one worker process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurant-default',
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurant-sessions',
+        'TIMEOUT': None,  # Entries are written with the session's own expiry
+    },
+    'idempotency': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'restaurant-idempotency',
+        'OPTIONS': {'MAX_ENTRIES': 10000},  # Bounded; oldest keys are culled first
+    },
+}
+
+# Stored responses for Idempotency-Key retries (orders.idempotency)
+IDEMPOTENCY_CACHE_ALIAS = 'idempotency'
+IDEMPOTENCY_KEY_TTL = 3600  # seconds a stored response can be replayed
+IDEMPOTENCY_LOCK_TIMEOUT = 10  # seconds a duplicate waits for the first request
+
+# Live kitchen feed (orders.events). LocalBroker only reaches screens connected
+# to the same process; use orders.events.PostgresNotifyBroker with several workers.
+ORDER_EVENTS_BROKER = 'orders.events.LocalBroker'
+ORDER_EVENTS_QUEUE_SIZE = 100  # events buffered per screen before it is dropped
+ORDER_STATUS_MAX_WAIT = 25  # longest get_order_status long-poll, in seconds
+DINER_HISTORY_CACHE_TIMEOUT = 300  # seconds a cached get_diner_orders page lives
+RECEIPT_CACHE_TIMEOUT = 86400  # seconds a rendered bill (orders.receipts) is kept
+MENU_TOMBSTONE_RETENTION_DAYS = 30  # deleted menu items are reported to tablets this long
+MENU_IMAGE_WORKERS = 1  # background threads resizing uploaded menu images (menu.images)
+ORDER_ARCHIVE_AFTER_DAYS = 180  # settled orders older than this are moved out by archive_orders
+
+# Shared secret for signed online banking callbacks (orders.gateway). Replace in production.
+PAYMENT_GATEWAY_SECRET = 'dev-payment-gateway-secret'
+
+# Rendered payment QR codes, cached under MEDIA_ROOT (orders.qr)
+QR_CACHE_DIR = 'qr_cache'
+QR_CACHE_MAX_FILES = 2000  # least recently used codes are evicted beyond this
+
+# Password hashing pool (accounts.passwords). Logins beyond
+# PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE in flight get a 429.
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE = 8
+PASSWORD_HASH_TIMEOUT = 5  # seconds a login waits for its check before giving up
+LOGIN_RETRY_AFTER = 5  # Retry-After value (seconds) on 429 responses
+
+# Failed-login budget per username and per client IP within the window (seconds)
+LOGIN_MAX_ATTEMPTS_PER_USER = 10
+LOGIN_MAX_ATTEMPTS_PER_IP = 50
+LOGIN_ATTEMPT_WINDOW = 300
@@ -0,0 +1,45 @@
+import re
+import hashlib
+import posixpath
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+
+# Names are the first 32 hex digits of the SHA-256 of the content
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{32}\.[A-Za-z0-9]+$')
+
+
+def is_hashed_name(name):
+    """Whether a media path was named by HashedFileSystemStorage, so its content never changes"""
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """
+    Stores each file under the hash of its content, in the directory it was
+    uploaded to, e.g. menu_item_images/3f8a...c2.png.
+
+    Uploading the same file again returns the existing name instead of
+    writing a copy, and a name always refers to the same bytes, so media can
+    be cached by clients forever. Files no longer referenced by any model are
+    removed with `python manage.py gc_media`.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        directory, filename = posixpath.split(name.replace('\\', '/'))
+        extension = posixpath.splitext(filename)[1].lower()
+        name = posixpath.join(directory, digest.hexdigest()[:32] + extension)
+        validate_file_name(name, allow_relative_path=True)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
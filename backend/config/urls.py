@@ -15,9 +15,10 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path, include
+import re
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from config.media import serve_media
 from rest_framework.routers import DefaultRouter
 
 # Import views from all apps
@@ -53,6 +54,9 @@ urlpatterns = [
     path('api/accounts/manager/list/', account_views.list_users_by_role, name='list_users_by_role'),
 
     # Menu URLs (using router)
+    path('api/menu/catalog/', menu_views.get_menu_catalog, name='menu_catalog'),
+    path('api/menu/changes/', menu_views.get_menu_changes, name='menu_changes'),
+    path('api/menu/search/', menu_views.search_menu, name='menu_search'),
     path('api/menu/', include(menu_router.urls)),
     path('api/menu/items/add/', menu_views.add_menu_items, name='add_menu_items'),
     path('api/menu/items/update/', menu_views.change_item_info, name='update_menu_items'),
@@ -63,17 +67,23 @@ urlpatterns = [
     path('api/orders/get_bill/', order_views.get_bill, name='get_bill'),
     path('api/orders/items/add/', order_views.add_order_item, name='add_order_item'),
     path('api/orders/items/remove/', order_views.remove_order_item, name='remove_order_item'),
+    path('api/orders/items/batch/', order_views.update_cart_items, name='update_cart_items'),
     path('api/orders/note/add/', order_views.add_note, name='add_note'),
     path('api/orders/service/choose/', order_views.choose_service, name='choose_service'),
     path('api/orders/submit/', order_views.submit_order, name='submit_order'),
     path('api/orders/update/', order_views.update_order, name='update_order'),
     path('api/orders/status/update/', order_views.update_order_status_by_staff, name='update_order_status_by_staff'),
+    path('api/orders/status/bulk_update/', order_views.bulk_update_order_status, name='bulk_update_order_status'),
     path('api/orders/status/', order_views.get_order_status, name='get_order_status'),
     path('api/orders/diner/', order_views.get_diner_orders, name='get_diner_orders'),
     path('api/orders/all/', order_views.get_all_orders, name='get_all_orders'),
     path('api/orders/kitchen/', order_views.get_kitchen_orders, name='get_kitchen_orders'),
+    path('api/orders/kitchen/stream/', order_views.stream_kitchen_orders, name='stream_kitchen_orders'),
     path('api/orders/pay/', order_views.process_payment, name='pay_for_order'),
+    path('api/orders/payment/<int:payment_id>/qr/<str:digest>.png', order_views.get_payment_qr_code, name='get_payment_qr_code'),
     path('api/orders/payment/confirm/', order_views.confirm_payment, name='confirm_payment'),
+    path('api/orders/payment/confirm/batch/', order_views.confirm_payments_batch, name='confirm_payments_batch'),
+    path('api/orders/payment/callback/', order_views.payment_gateway_callback, name='payment_gateway_callback'),
     # Reviews URLs (using router)
     path('api/reviews/', include(review_router.urls)),
     path('api/submit_feedback/', review_views.submit_feedback, name="submit_feedback"),
@@ -84,5 +94,9 @@ urlpatterns = [
     path('api/analytics/rating/', analytics_views.get_rating_analytics, name='get_rating_analytics'),
     path('api/analytics/revenue/', analytics_views.get_revenue_analytics, name='get_revenue_analytics'),
     path('api/analytics/order-count/', analytics_views.get_menu_items_order_count, name='get_order_count'),
+]
 
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+if settings.SERVE_MEDIA:
+    # Media uploads, with long-lived caching for content-hashed files (config.media)
+    urlpatterns.append(
+        re_path(rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?P<path>.+)$', serve_media, name='media'))
\ No newline at end of file
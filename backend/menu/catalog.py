@@ -0,0 +1,163 @@
+import json
+import time
+import threading
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.http import quote_etag
+from django.utils import timezone
+from .models import Menu, MenuItem, MenuItemTombstone
+
+# The public menu catalog (all menus with their items), rendered once per
+# catalog version and kept in this process as ready-to-send JSON.
+#
+# The version combines a revision stamp, bumped by signals on every Menu and
+# MenuItem save or delete (see menu.signals), with the newest item
+# last_modified and the item count. The stamp lives in the cache, so with a
+# shared cache backend every worker sees it at once; the item columns still
+# catch item edits made by other workers when the cache is per process.
+
+REVISION_KEY = 'menu:catalog_revision'
+
+_lock = threading.Lock()
+_rendered = None  # (version, etag, last_modified, body) of the newest render
+
+
+def catalog_revision():
+    """Nanosecond timestamp of the last menu change seen through signals"""
+    revision = cache.get(REVISION_KEY)
+    if revision is None:
+        cache.add(REVISION_KEY, time.time_ns(), None)
+        revision = cache.get(REVISION_KEY)
+    return revision
+
+def bump_catalog_revision():
+    """Mark the catalog changed once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(REVISION_KEY, time.time_ns(), None))
+
+def catalog_version():
+    """
+    (version string, last-modified POSIX timestamp) of the current catalog.
+    Costs one aggregate query.
+    """
+    revision = catalog_revision()
+    items = MenuItem.objects.aggregate(newest=Max('last_modified'), count=Count('id'))
+    newest = items['newest'].timestamp() if items['newest'] else 0
+    # Menu edits and deletions only show up in the revision stamp
+    last_modified = max(newest, revision / 1_000_000_000)
+    return f"{revision}-{int(newest * 1_000_000)}-{items['count']}", last_modified
+
+def _media_url(name):
+    return f"{settings.MEDIA_URL}{name}" if name else None
+
+ITEM_FIELDS = ('id', 'menu_id', 'name', 'description', 'price', 'image', 'image_variants', 'last_modified')
+
+def serialize_variants(image_name, image_variants):
+    """WebP variants of the image as {name: {url, width, height}}; empty until generated"""
+    if not image_variants or image_variants.get("source") != image_name:
+        return {}
+    return {
+        variant: {"url": _media_url(meta["name"]), "width": meta["width"], "height": meta["height"]}
+        for variant, meta in image_variants["variants"].items()
+    }
+
+def serialize_item(item):
+    """Catalog representation of a MenuItem values() row"""
+    return {
+        "id": item['id'],
+        "menu": item['menu_id'],
+        "name": item['name'],
+        "description": item['description'],
+        "price": item['price'],
+        "image": _media_url(item['image']),
+        "image_variants": serialize_variants(item['image'], item['image_variants']),
+        "last_modified": item['last_modified'],
+    }
+
+def serialize_menu(menu):
+    return {
+        "id": menu['id'],
+        "name": menu['name'],
+        "description": menu['description'],
+        "image": _media_url(menu['image']),
+    }
+
+def build_catalog():
+    """All menus with their items, read in one query"""
+    rows = Menu.objects.values(
+        'id', 'name', 'description', 'image',
+        'items__id', 'items__name', 'items__description', 'items__price', 'items__image',
+        'items__image_variants', 'items__last_modified',
+    ).order_by('id', 'items__id')
+    menus = {}
+    for row in rows:
+        menu = menus.get(row['id'])
+        if menu is None:
+            menu = menus[row['id']] = {**serialize_menu(row), "items": []}
+        if row['items__id'] is not None:  # Menus without items come back as one row of nulls
+            menu["items"].append(serialize_item({
+                "id": row['items__id'],
+                "menu_id": row['id'],
+                "name": row['items__name'],
+                "description": row['items__description'],
+                "price": row['items__price'],
+                "image": row['items__image'],
+                "image_variants": row['items__image_variants'],
+                "last_modified": row['items__last_modified'],
+            }))
+    return list(menus.values())
+
+def get_catalog():
+    """
+    (etag, last_modified, body) of the current catalog, where body is the
+    encoded JSON response. Rendered only when the version has changed.
+    """
+    global _rendered
+    version, last_modified = catalog_version()
+    rendered = _rendered
+    if rendered is not None and rendered[0] == version:
+        return rendered[1:]
+    with _lock:
+        rendered = _rendered
+        if rendered is None or rendered[0] != version:
+            body = json.dumps({"status": "success", "version": version, "menus": build_catalog()}, cls=DjangoJSONEncoder)
+            rendered = _rendered = (version, quote_etag(f"catalog-{version}"), last_modified, body.encode())
+    return rendered[1:]
+
+
+# Delta sync for tablets that keep a local copy of the catalog. Sync tokens
+# are microseconds since the epoch; changes this close before a token are
+# sent again, so writes that committed late are not missed.
+SYNC_OVERLAP = timedelta(seconds=2)
+
+def encode_sync_token(dt):
+    return str(int(dt.timestamp() * 1_000_000))
+
+def decode_sync_token(token):
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'MENU_TOMBSTONE_RETENTION_DAYS', 30))
+
+def menu_changes(since):
+    """
+    Catalog changes after the datetime `since`: a dict of changed items,
+    IDs of deleted items, and (when anything changed) the menus, which are
+    few and carry no timestamp of their own. None if `since` is older than
+    the deletion log, so the caller must reload the full catalog.
+    """
+    if since < timezone.now() - tombstone_retention():
+        return None
+    since = since - SYNC_OVERLAP
+    items = [serialize_item(item) for item in
+             MenuItem.objects.filter(last_modified__gte=since).values(*ITEM_FIELDS).order_by('id')]
+    deleted = list(MenuItemTombstone.objects.filter(deleted_at__gte=since)
+                   .values_list('menu_item_id', flat=True).distinct())
+    changes = {"items": items, "deleted": deleted}
+    if catalog_revision() >= since.timestamp() * 1_000_000_000:
+        changes["menus"] = [serialize_menu(menu) for menu in
+                            Menu.objects.values('id', 'name', 'description', 'image').order_by('id')]
+    return changes
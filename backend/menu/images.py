@@ -0,0 +1,135 @@
+import io
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+from .models import MenuItem
+from .catalog import bump_catalog_revision
+
+logger = logging.getLogger(__name__)
+
+# Resized WebP copies of menu item images, so clients download an image the
+# size they show instead of the uploaded original. Widths are maxima; images
+# are never upscaled. The result is stored on the item as
+# {"source": <image name>, "variants": {name: {"name", "width", "height"}}}
+# and only trusted while "source" is still the item's image.
+
+VARIANT_WIDTHS = {
+    'thumb': 160,
+    'medium': 480,
+    'large': 1024,
+}
+WEBP_QUALITY = 80
+VARIANT_DIR = 'menu_item_images/variants'
+
+
+def render_variants(source_name):
+    """
+    Write the WebP variants of a stored image and return their metadata.
+    Touches only the storage, not the database, so it can run in another
+    process (see the generate_menu_image_variants command).
+    """
+    with default_storage.open(source_name, 'rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    stem = os.path.splitext(os.path.basename(source_name))[0]
+    variants = {}
+    previous = None
+    for variant, width in VARIANT_WIDTHS.items():
+        resized = image.copy()
+        resized.thumbnail((width, width * 10), Image.Resampling.LANCZOS)
+        if previous is not None and previous["width"] == resized.width:
+            # Small originals come out the same size for the larger widths; share the file
+            variants[variant] = previous
+            continue
+        buffer = io.BytesIO()
+        resized.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+        name = default_storage.save(f"{VARIANT_DIR}/{stem}-{variant}.webp", ContentFile(buffer.getvalue()))
+        variants[variant] = previous = {"name": name, "width": resized.width, "height": resized.height}
+    return {"source": source_name, "variants": variants}
+
+def _variant_names(image_variants):
+    return {variant["name"] for variant in (image_variants or {}).get("variants", {}).values()}
+
+def store_variants(item_id, image_variants):
+    """
+    Attach rendered variants to a menu item, if its image is still the one
+    they were made from, and delete the files they replace.
+    Returns False (and deletes the new files) when the image has changed.
+    """
+    with transaction.atomic():
+        previous = MenuItem.objects.select_for_update().filter(
+            id=item_id, image=image_variants["source"]).values_list('image_variants', flat=True).first()
+        # Bump last_modified too, so tablets syncing menu changes pick the variants up
+        updated = MenuItem.objects.filter(id=item_id, image=image_variants["source"]).update(
+            image_variants=image_variants, last_modified=timezone.now())
+        if updated:
+            bump_catalog_revision()
+
+    if updated:
+        if previous:
+            _delete_unreferenced(_variant_names(previous) - _variant_names(image_variants), previous["source"], item_id)
+    else:
+        # Made for an image the item no longer has
+        _delete_unreferenced(_variant_names(image_variants), image_variants["source"], item_id)
+    return bool(updated)
+
+def _delete_unreferenced(names, source, item_id):
+    """Delete variant files, except those other items (with the same source image) still use"""
+    in_use = set()
+    for other in MenuItem.objects.exclude(id=item_id).filter(
+            image_variants__source=source).values_list('image_variants', flat=True):
+        in_use |= _variant_names(other)
+    for name in names - in_use:
+        default_storage.delete(name)
+
+_suspended = threading.local()
+
+@contextmanager
+def suspend_variant_generation():
+    """
+    Don't schedule variants for items saved in this thread inside the block,
+    e.g. while seeding; generate_menu_image_variants covers them later.
+    """
+    previous = getattr(_suspended, 'active', False)
+    _suspended.active = True
+    try:
+        yield
+    finally:
+        _suspended.active = previous
+
+def variant_generation_suspended():
+    return getattr(_suspended, 'active', False)
+
+def needs_variants(image_name, image_variants):
+    return bool(image_name) and (image_variants or {}).get("source") != image_name
+
+
+_executor = ThreadPoolExecutor(max_workers=getattr(settings, 'MENU_IMAGE_WORKERS', 1),
+                               thread_name_prefix='menu-image-variants')
+
+def _generate(item_id, source_name):
+    try:
+        store_variants(item_id, render_variants(source_name))
+    except Exception:
+        logger.exception("Could not generate image variants for menu item %s", item_id)
+    finally:
+        connection.close()  # Pool threads outlive requests; don't leave connections open
+
+def schedule_variants(item_id, source_name):
+    """
+    Generate variants for a menu item's image on the background pool once
+    the current transaction commits. The upload request doesn't wait for it;
+    until it finishes, clients fall back to the original image.
+    """
+    transaction.on_commit(lambda: _executor.submit(_generate, item_id, source_name))
@@ -0,0 +1,57 @@
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from menu.models import Menu, MenuItem
+
+# Directories holding model uploads. Anything else under MEDIA_ROOT (the QR
+# code cache, the demo QR image) is managed elsewhere and never touched.
+UPLOAD_DIRS = ['menu_images', 'menu_item_images']
+
+
+def referenced_media():
+    """Names of every media file a Menu or MenuItem points at"""
+    names = set(Menu.objects.exclude(image='').values_list('image', flat=True))
+    for image, image_variants in MenuItem.objects.values_list('image', 'image_variants').iterator():
+        if image:
+            names.add(image)
+        for variant in (image_variants or {}).get('variants', {}).values():
+            names.add(variant['name'])
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Deletes uploaded media files that no menu or menu item refers to any more'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age-hours', type=float, default=24,
+                            help='Only delete files older than this, so uploads still being saved are kept (default: 24)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list the files that would be deleted')
+
+    def handle(self, *args, **options):
+        if options['min_age_hours'] < 0:
+            raise CommandError('--min-age-hours must not be negative')
+        cutoff = time.time() - options['min_age_hours'] * 3600
+        # Read references before listing files: a file uploaded after this is newer than the cutoff
+        referenced = referenced_media()
+
+        deleted = 0
+        freed = 0
+        for upload_dir in UPLOAD_DIRS:
+            for root, _, files in os.walk(os.path.join(settings.MEDIA_ROOT, upload_dir)):
+                for filename in files:
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, settings.MEDIA_ROOT).replace(os.sep, '/')
+                    stat = os.stat(path)
+                    if name in referenced or stat.st_mtime > cutoff:
+                        continue
+                    if options['dry_run']:
+                        self.stdout.write(f'Would delete {name}')
+                    else:
+                        os.remove(path)
+                    deleted += 1
+                    freed += stat.st_size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} unreferenced media files ({freed / 1_048_576:.1f} MB).'))
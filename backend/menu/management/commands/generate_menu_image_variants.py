@@ -0,0 +1,50 @@
+import os
+import django
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand, CommandError
+from menu.models import MenuItem
+from menu.images import needs_variants, render_variants, store_variants
+
+
+class Command(BaseCommand):
+    help = 'Generates resized WebP variants for menu item images that lack them, on a pool of processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Images resized in parallel (default: number of CPUs)')
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        # Items sharing an image (e.g. seeded ones) share one set of variants
+        item_ids_by_image = {}
+        for item in MenuItem.objects.exclude(image='').values('id', 'image', 'image_variants').order_by('id'):
+            if options['force'] or needs_variants(item['image'], item['image_variants']):
+                item_ids_by_image.setdefault(item['image'], []).append(item['id'])
+        if not item_ids_by_image:
+            self.stdout.write('All menu item images have variants.')
+            return
+
+        generated = 0
+        failed = 0
+        # Resizing is CPU bound, so it runs in worker processes; they only touch
+        # the storage, and results are saved to the database from here
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            futures = {pool.submit(render_variants, image): image for image in item_ids_by_image}
+            for future in as_completed(futures):
+                image = futures[future]
+                try:
+                    image_variants = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f'{image}: {exc}')
+                    continue
+                stored = [item_id for item_id in item_ids_by_image[image] if store_variants(item_id, image_variants)]
+                if stored:
+                    generated += 1
+                    self.stdout.write(f'Generated variants for {image} (menu items {", ".join(map(str, stored))})')
+
+        message = f'Generated variants for {generated} of {len(item_ids_by_image)} menu item images.'
+        self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(f'{message} {failed} failed.'))
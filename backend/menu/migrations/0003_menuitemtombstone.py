@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 02:32
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_alter_menu_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MenuItemTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_item_id', models.BigIntegerField()),
+                ('menu_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
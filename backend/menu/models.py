@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
@@ -17,7 +18,23 @@ class MenuItem(models.Model):
     price = models.DecimalField(max_digits=8, decimal_places=2)
     menu = models.ForeignKey(Menu, on_delete=models.CASCADE, related_name='items')
     image = models.ImageField(upload_to='menu_item_images/', blank=False, null=False)
+    # Resized WebP copies of `image`, filled in by menu.images after upload
+    image_variants = models.JSONField(default=dict, blank=True)
     last_modified = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return f"{self.name} - {self.price}"
\ No newline at end of file
+        return f"{self.name} - {self.price}"
+
+
+class MenuItemTombstone(models.Model):
+    """
+    Record of a deleted menu item, written by menu.signals, so tablets syncing
+    with /api/menu/changes/ learn about removals. Pruned after
+    MENU_TOMBSTONE_RETENTION_DAYS; older sync tokens get a full reset.
+    """
+    menu_item_id = models.BigIntegerField()
+    menu_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"Deleted menu item #{self.menu_item_id}"
@@ -0,0 +1,164 @@
+import re
+import time
+import bisect
+import threading
+import unicodedata
+from collections import defaultdict
+from django.utils import timezone
+from .models import MenuItem
+from .catalog import ITEM_FIELDS, catalog_revision, menu_changes, serialize_item
+
+# Menu item search, answered from an index kept in this process so
+# type-ahead requests don't touch the database.
+#
+# Names and descriptions are folded to unaccented lowercase words ("Trà đào"
+# becomes "tra", "dao") and indexed word -> item IDs. Every query word must
+# match the start of a word in the item, so results narrow as the user types.
+# When nothing matches, items whose name shares enough trigrams with the
+# query are returned instead, which catches small typos ("bibimbab").
+#
+# The index follows the catalog revision (see menu.catalog): after a change
+# it reloads only the items changed since its last sync, using the same
+# query as the delta sync endpoint. Because the revision stamp is only seen
+# by other workers with a shared cache, the index also resyncs at least
+# every MAX_STALENESS seconds.
+
+MAX_STALENESS = 30
+MIN_TRIGRAM_SIMILARITY = 0.3
+WORD_RE = re.compile(r'[a-z0-9]+')
+
+# NFKD splits accented letters into base letter and combining marks, but
+# đ has no decomposition
+_FOLD_TABLE = str.maketrans({'đ': 'd', 'Đ': 'd'})
+
+
+def fold(text):
+    """Lowercase text without diacritics: fold("Cơm Trộn") == "com tron" """
+    decomposed = unicodedata.normalize('NFKD', text.translate(_FOLD_TABLE))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+def words(text):
+    return WORD_RE.findall(fold(text or ''))
+
+def trigrams(text):
+    """Trigrams of each word, padded so word starts weigh more"""
+    grams = set()
+    for word in words(text):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}  # id -> (serialized item, name words, description words, name trigrams)
+        self._postings = defaultdict(set)  # word -> item IDs
+        self._trigram_postings = defaultdict(set)  # name trigram -> item IDs
+        self._vocabulary = []  # Sorted words, for prefix lookups
+        self._revision = None
+        self._synced_at = None
+        self._checked_at = 0
+
+    def _add(self, item):
+        name_words, description_words = set(words(item["name"])), set(words(item["description"]))
+        name_trigrams = trigrams(item["name"])
+        self._items[item["id"]] = (item, name_words, description_words, name_trigrams)
+        for word in name_words | description_words:
+            self._postings[word].add(item["id"])
+        for gram in name_trigrams:
+            self._trigram_postings[gram].add(item["id"])
+
+    def _remove(self, item_id):
+        entry = self._items.pop(item_id, None)
+        if entry is None:
+            return
+        _, name_words, description_words, name_trigrams = entry
+        for postings, keys in ((self._postings, name_words | description_words),
+                               (self._trigram_postings, name_trigrams)):
+            for key in keys:
+                postings[key].discard(item_id)
+                if not postings[key]:
+                    del postings[key]
+
+    def _sync(self):
+        """Bring the index up to date with the database; call with the lock held"""
+        revision = catalog_revision()
+        if revision == self._revision and time.monotonic() - self._checked_at < MAX_STALENESS:
+            return
+        # Taken before querying, so nothing written meanwhile is skipped next time
+        now = timezone.now()
+        changes = menu_changes(self._synced_at) if self._synced_at else None
+        if changes is None:
+            self._items.clear()
+            self._postings.clear()
+            self._trigram_postings.clear()
+            for item in MenuItem.objects.values(*ITEM_FIELDS).iterator():
+                self._add(serialize_item(item))
+        else:
+            for item_id in changes["deleted"]:
+                self._remove(item_id)
+            for item in changes["items"]:
+                self._remove(item["id"])
+                self._add(item)
+        self._vocabulary = sorted(self._postings)
+        self._revision = revision
+        self._synced_at = now
+        self._checked_at = time.monotonic()
+
+    def _prefix_matches(self, term):
+        """{item ID: best word score} for words starting with term"""
+        matches = {}
+        start = bisect.bisect_left(self._vocabulary, term)
+        for word in self._vocabulary[start:]:
+            if not word.startswith(term):
+                break
+            for item_id in self._postings[word]:
+                _, name_words, _, _ = self._items[item_id]
+                # Whole words beat prefixes, and names beat descriptions
+                score = (2 if word in name_words else 0) + (1 if word == term else 0.5)
+                matches[item_id] = max(score, matches.get(item_id, 0))
+        return matches
+
+    def _similar(self, query):
+        grams = trigrams(query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for item_id in self._trigram_postings.get(gram, ()):
+                shared[item_id] += 1
+        scores = {}
+        for item_id, count in shared.items():
+            similarity = count / len(grams | self._items[item_id][3])
+            if similarity >= MIN_TRIGRAM_SIMILARITY:
+                scores[item_id] = similarity
+        return scores
+
+    def search(self, query, limit=20, menu_id=None):
+        """Serialized items matching query, best first"""
+        terms = words(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._sync()
+            scores = None
+            for term in terms:
+                matches = self._prefix_matches(term)
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {item_id: score + matches[item_id] for item_id, score in scores.items() if item_id in matches}
+                if not scores:
+                    break
+            if not scores:
+                scores = self._similar(query)
+            entries = [self._items[item_id][0] for item_id in scores]
+        if menu_id is not None:
+            entries = [item for item in entries if item["menu"] == menu_id]
+        entries.sort(key=lambda item: (-scores[item["id"]], fold(item["name"]), item["id"]))
+        return entries[:limit]
+
+
+index = SearchIndex()
+
+def search_menu_items(query, limit=20, menu_id=None):
+    return index.search(query, limit=limit, menu_id=menu_id)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Menu, MenuItem, MenuItemTombstone
+from .catalog import bump_catalog_revision, tombstone_retention
+from .images import needs_variants, schedule_variants, variant_generation_suspended
+
+
+@receiver(post_save, sender=Menu)
+@receiver(post_delete, sender=Menu)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def menu_changed(sender, **kwargs):
+    bump_catalog_revision()
+
+
+@receiver(post_delete, sender=MenuItem)
+def record_menu_item_deletion(sender, instance, **kwargs):
+    # Also fires for items removed along with their menu
+    MenuItemTombstone.objects.create(menu_item_id=instance.id, menu_id=instance.menu_id)
+    MenuItemTombstone.objects.filter(deleted_at__lt=timezone.now() - tombstone_retention()).delete()
+
+
+@receiver(post_save, sender=MenuItem)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    # New or replaced image; fixtures (raw saves) and seeding are left to the backfill command
+    if raw or variant_generation_suspended():
+        return
+    if needs_variants(instance.image.name, instance.image_variants):
+        schedule_variants(instance.id, instance.image.name)
@@ -3,6 +3,11 @@ from .models import Menu, MenuItem
 from .serializers import MenuSerializer, MenuItemSerializer
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.utils import timezone
+from .catalog import get_catalog, menu_changes, encode_sync_token, decode_sync_token
+from .search import search_menu_items
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 
@@ -37,6 +42,73 @@ class MenuItemViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(menu_id=menu_id)
         return queryset
 
+def get_menu_catalog(request: HttpResponse) -> HttpResponse:
+    """
+    All menus with their items nested, in one response. Public.
+    The encoded catalog is cached per version (see menu.catalog), and
+    If-None-Match / If-Modified-Since get a 304, so repeat loads cost one
+    aggregate query and no serialization.
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    etag, last_modified, body = get_catalog()
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if response is None:
+        response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Clients may keep the catalog but must revalidate it on every load
+    response["Cache-Control"] = "public, no-cache"
+    return response
+
+def get_menu_changes(request: HttpResponse) -> JsonResponse:
+    """
+    Menu changes since a sync token, for tablets that keep a local catalog. Public.
+    Returns changed items, IDs of deleted items and, if anything changed, all
+    menus, plus a `token` for the next call. Changes close to the token may be
+    sent twice, so clients should upsert by id. A missing or expired token
+    gets `reset: true`: reload /api/menu/catalog/ and sync from the new token.
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    # Taken before querying, so nothing written during this request is skipped next time
+    token = encode_sync_token(timezone.now())
+    since = request.GET.get("since")
+    changes = None
+    if since:
+        try:
+            changes = menu_changes(decode_sync_token(since))
+        except (ValueError, OverflowError, OSError):
+            return JsonResponse({"status": "error", "message": "Invalid since token"}, status=400)
+    if changes is None:
+        return JsonResponse({"status": "success", "reset": True, "token": token})
+    return JsonResponse({"status": "success", "reset": False, **changes, "token": token})
+
+def search_menu(request: HttpResponse) -> JsonResponse:
+    """
+    Search menu items by name and description. Public.
+    Accents and case are ignored, and the last word may be incomplete, so it
+    can be called on every keystroke: ?q=tra da finds "Trà đào cam sả".
+    Optional `menu` restricts results to one menu, `limit` caps them (max 50).
+    Served from an in-memory index (see menu.search).
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    query = request.GET.get("q", "")
+    try:
+        limit = min(int(request.GET.get("limit", 20)), 50)
+        menu_id = int(request.GET["menu"]) if request.GET.get("menu") else None
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid limit or menu"}, status=400)
+    if limit < 1:
+        return JsonResponse({"status": "error", "message": "Invalid limit or menu"}, status=400)
+
+    results = search_menu_items(query, limit=limit, menu_id=menu_id)
+    return JsonResponse({"status": "success", "query": query, "results": results})
+
 @csrf_exempt
 def add_menu_items(request: HttpResponse) -> JsonResponse:
     """
@@ -44,7 +116,7 @@ def add_menu_items(request: HttpResponse) -> JsonResponse:
     Supports both JWT and session authentication
     """
     if request.method == "POST":
-        from accounts.views import get_current_user, is_manager
+        from accounts.auth import get_current_user, is_manager
         current_user = get_current_user(request)
         
         if not current_user:
@@ -87,7 +159,7 @@ def remove_menu_items(request: HttpResponse) -> JsonResponse:
     Supports both JWT and session authentication
     """
     if request.method == "POST":
-        from accounts.views import get_current_user, is_manager
+        from accounts.auth import get_current_user, is_manager
         current_user = get_current_user(request)
         
         if not current_user:
@@ -117,7 +189,7 @@ def change_item_info(request: HttpResponse) -> JsonResponse:
     Supports both JWT and session authentication
     """
     if request.method == "POST":
-        from accounts.views import get_current_user, is_manager
+        from accounts.auth import get_current_user, is_manager
         current_user = get_current_user(request)
         
         if not current_user:
@@ -0,0 +1,237 @@
+import json
+import queue
+import select
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One listener's bounded queue of events, bound to the event loop that created it"""
+
+    def __init__(self, broker, loop, queue):
+        self.broker = broker
+        self.loop = loop
+        self.queue = queue
+
+    async def get(self, timeout=None):
+        """
+        Wait for the next event. Returns None once the broker has dropped this
+        subscription; raises asyncio.TimeoutError if nothing arrives in time.
+        """
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def deliver(self, event):
+        self.loop.call_soon_threadsafe(self.broker._deliver, self, event)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class ThreadSubscription:
+    """
+    Subscription read by a blocking thread instead of an event loop, for
+    streams served by WSGI workers. Same interface as Subscription, but
+    timeouts raise the built-in TimeoutError.
+    """
+
+    def __init__(self, broker, max_queue):
+        self.broker = broker
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError from None
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.broker.unsubscribe(self)
+            try:
+                self.queue.get_nowait()  # Make room for the close marker
+            except queue.Empty:
+                pass
+            self.queue.put_nowait(None)
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """
+    In-process pub/sub for order events.
+
+    Views publish from whatever thread they run on; events are handed to each
+    subscriber's event loop with call_soon_threadsafe. Queues are bounded: a
+    subscriber that falls too far behind is dropped rather than buffered
+    without limit, and should resync from the polling endpoint.
+
+    Synchronous views can also block on a single order with watch().
+    """
+
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscriptions = set()
+        self._watchers = {}  # order_id -> threading.Events of requests waiting on it
+        self._lock = threading.Lock()
+
+    def publish(self, event):
+        self.fan_out(event)
+
+    def fan_out(self, event):
+        """Deliver an event to every subscription in this process"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            for changed in self._watchers.get(event["order_id"], ()):
+                changed.set()
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:  # Event loop already closed
+                self.unsubscribe(subscription)
+
+    def _deliver(self, subscription, event):
+        try:
+            subscription.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.unsubscribe(subscription)
+            subscription.queue.get_nowait()  # Make room for the close marker
+            subscription.queue.put_nowait(None)
+
+    def subscribe(self, threaded=False):
+        """
+        Start receiving events on the running event loop, or with
+        threaded=True on a queue read by a blocking thread
+        """
+        if threaded:
+            subscription = ThreadSubscription(self, self.max_queue)
+        else:
+            subscription = Subscription(self, asyncio.get_running_loop(), asyncio.Queue(maxsize=self.max_queue))
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @contextmanager
+    def watch(self, order_id):
+        """
+        Yield a threading.Event that is set when an event for `order_id` is
+        published while the block runs. Enter it before reading the order,
+        so a write landing between the read and the wait is not missed.
+        """
+        changed = threading.Event()
+        with self._lock:
+            self._watchers.setdefault(order_id, set()).add(changed)
+        try:
+            yield changed
+        finally:
+            with self._lock:
+                watchers = self._watchers[order_id]
+                watchers.discard(changed)
+                if not watchers:
+                    del self._watchers[order_id]
+
+
+class PostgresNotifyBroker(LocalBroker):
+    """
+    Cross-worker broker using PostgreSQL LISTEN/NOTIFY.
+
+    Events are sent with pg_notify, so every worker connected to the same
+    database receives them. Each process runs one listener thread on a
+    dedicated connection and fans the notifications out to its local
+    subscribers.
+    """
+
+    channel = 'order_events'
+
+    def __init__(self, max_queue=100):
+        super().__init__(max_queue)
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, json.dumps(event)])
+
+    def subscribe(self, threaded=False):
+        self._ensure_listener()
+        return super().subscribe(threaded)
+
+    def watch(self, order_id):
+        self._ensure_listener()
+        return super().watch(order_id)
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='order-events-listener', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        # A raw connection of its own: Django's connections are per-thread and
+        # transactional, while LISTEN needs a long-lived autocommit session
+        listen_conn = connection.get_new_connection(connection.get_connection_params())
+        listen_conn.autocommit = True
+        try:
+            with listen_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            while True:
+                if select.select([listen_conn], [], [], 30) == ([], [], []):
+                    continue
+                listen_conn.poll()
+                while listen_conn.notifies:
+                    notify = listen_conn.notifies.pop(0)
+                    self.fan_out(json.loads(notify.payload))
+        except Exception:
+            logger.exception("Order event listener stopped")
+        finally:
+            listen_conn.close()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+def get_broker():
+    """The process-wide broker configured by ORDER_EVENTS_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                broker_class = import_string(getattr(settings, 'ORDER_EVENTS_BROKER', 'orders.events.LocalBroker'))
+                _broker = broker_class(max_queue=getattr(settings, 'ORDER_EVENTS_QUEUE_SIZE', 100))
+    return _broker
+
+def publish_order_event(event_type, order, previous_status=None):
+    """
+    Publish an order event once the current transaction commits.
+    Rolled-back writes never reach the screens.
+    """
+    event = {
+        "type": event_type,
+        "order_id": order.id,
+        "status": order.status,
+        "previous_status": previous_status,
+        "version": order.version,
+        "last_modified": order.last_modified.isoformat() if order.last_modified else None,
+    }
+    transaction.on_commit(lambda: _publish(event))
+
+def _publish(event):
+    # Live updates are best effort; screens resync through the kitchen
+    # endpoint, so a broker failure must not fail the committed write
+    try:
+        get_broker().publish(event)
+    except Exception:
+        logger.exception("Could not publish order event %s", event["type"])
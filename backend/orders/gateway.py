@@ -0,0 +1,19 @@
+import hmac
+import hashlib
+from django.conf import settings
+
+# Callbacks from the online banking gateway are authenticated by an
+# HMAC-SHA256 of the raw request body, sent hex encoded in this header
+SIGNATURE_HEADER = 'HTTP_X_GATEWAY_SIGNATURE'
+
+
+def _secret():
+    return settings.PAYMENT_GATEWAY_SECRET.encode()
+
+def sign_payload(body):
+    """Signature the gateway sends with a callback body (bytes)"""
+    return hmac.new(_secret(), body, hashlib.sha256).hexdigest()
+
+def verify_signature(request):
+    signature = request.META.get(SIGNATURE_HEADER, '')
+    return hmac.compare_digest(sign_payload(request.body), signature)
@@ -0,0 +1,41 @@
+import time
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+# Per-diner cache of get_diner_orders pages. Every page key embeds the diner's
+# current history version; order writes drop the version key, so all of that
+# diner's cached pages go stale at once without having to be enumerated.
+
+
+def _version_key(diner_id):
+    return f"orders:diner_history_version:{diner_id}"
+
+def _history_version(diner_id):
+    key = _version_key(diner_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh, never-reused value, so pages cached under an evicted
+        # version can't come back to life
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+def history_page_key(diner_id, cursor, limit):
+    # Cursors come from the query string; hash them into a backend-safe key
+    cursor_digest = hashlib.sha256((cursor or '').encode()).hexdigest()[:32]
+    return f"orders:diner_history:{diner_id}:{_history_version(diner_id)}:{cursor_digest}:{limit}"
+
+def get_cached_history_page(key):
+    return cache.get(key)
+
+def cache_history_page(key, page):
+    cache.set(key, page, getattr(settings, 'DINER_HISTORY_CACHE_TIMEOUT', 300))
+
+def invalidate_diner_history(diner_id):
+    """
+    Drop a diner's cached order history once the current transaction commits.
+    Call from every write that changes an order's status, total or items.
+    """
+    transaction.on_commit(lambda: cache.delete(_version_key(diner_id)))
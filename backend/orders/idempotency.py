@@ -0,0 +1,102 @@
+import time
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+from accounts.auth import get_current_user
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+# Besides 2xx, only validation errors are stored: they are the same for every
+# retry of the same body. Auth failures (401/403) and lock timeouts (409) may
+# succeed on a retry, so those requests run again.
+REPLAYABLE_ERRORS = {400, 422}
+
+
+def _idempotency_cache():
+    return caches[getattr(settings, 'IDEMPOTENCY_CACHE_ALIAS', 'default')]
+
+def _request_fingerprint(request):
+    """Identify the request behind a key, so a key reused with a different payload is caught"""
+    return hashlib.sha256(request.body).hexdigest()
+
+def _caller_scope(request):
+    """
+    Who a key belongs to: the authenticated user, else the session, so one
+    client's key never replays another client's response. None for callers
+    with neither.
+    """
+    user = get_current_user(request)
+    if user:
+        return f"user:{user.id}"
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    return f"session:{session_key}" if session_key else None
+
+def _should_store(response):
+    return not response.streaming and (200 <= response.status_code < 300 or response.status_code in REPLAYABLE_ERRORS)
+
+def _replay(stored):
+    response = HttpResponse(stored['content'], status=stored['status'], content_type=stored['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+def idempotent(view_func):
+    """
+    Make a POST view safe to retry with an `Idempotency-Key` header.
+
+    The first response for a key is stored for IDEMPOTENCY_KEY_TTL seconds and
+    replayed verbatim for later requests with the same key, without running
+    the view again. Concurrent duplicates wait on a lock for the first one to
+    finish. Keys are scoped to the caller (user, else session); requests
+    without the header, or from anonymous callers, run as before. Only 2xx
+    and validation errors are stored, so other failures can be retried for real.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if request.method != 'POST' or not key:
+            return view_func(request, *args, **kwargs)
+        if len(key) > 255:
+            return JsonResponse({"status": "error", "message": "Idempotency-Key too long"}, status=400)
+
+        scope = _caller_scope(request)
+        if scope is None:
+            # Nothing ties a key to an anonymous caller, so replays could leak another client's response
+            return view_func(request, *args, **kwargs)
+
+        cache = _idempotency_cache()
+        key_digest = hashlib.sha256(f"{scope}\0{key}".encode()).hexdigest()
+        response_key = f"idempotency:response:{request.path}:{key_digest}"
+        lock_key = f"idempotency:lock:{request.path}:{key_digest}"
+        fingerprint = _request_fingerprint(request)
+        ttl = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 3600)
+        lock_timeout = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 10)
+
+        deadline = time.monotonic() + lock_timeout
+        while True:
+            stored = cache.get(response_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    return JsonResponse({"status": "error", "message": "Idempotency-Key was already used for a different request"}, status=422)
+                return _replay(stored)
+            # cache.add is atomic, so only one request per key gets to run the view
+            if cache.add(lock_key, fingerprint, lock_timeout):
+                break
+            if time.monotonic() >= deadline:
+                return JsonResponse({"status": "error", "message": "A request with this Idempotency-Key is still in progress"}, status=409)
+            time.sleep(0.05)
+
+        try:
+            response = view_func(request, *args, **kwargs)
+            if _should_store(response):
+                cache.set(response_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                }, ttl)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+    return wrapper
@@ -0,0 +1,102 @@
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from orders.models import Order, OrderItem, Payment, ArchivedOrder, ArchivedOrderItem, ArchivedPayment
+from orders.history import invalidate_diner_history
+
+ORDER_FIELDS = ['id', 'service_type', 'status', 'note', 'total_price', 'diner_id', 'time_created', 'last_modified', 'version']
+ITEM_FIELDS = ['id', 'order_id', 'menu_item_id', 'quantity', 'unit_price', 'item_name']
+PAYMENT_FIELDS = ['id', 'order_id', 'method', 'time_created', 'status']
+
+
+def month_start(dt):
+    dt = dt.astimezone(dt_timezone.utc)
+    return datetime(dt.year, dt.month, 1, tzinfo=dt_timezone.utc)
+
+def next_month(start):
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1, tzinfo=dt_timezone.utc)
+
+def ensure_archive_partitions(times):
+    """Create the monthly archive partitions (PostgreSQL only) covering `times`"""
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for start in sorted({month_start(t) for t in times}):
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS orders_archivedorder_p{start:%Y%m} "
+                f"PARTITION OF orders_archivedorder FOR VALUES FROM (%s) TO (%s)",
+                [start, next_month(start)]
+            )
+
+
+class Command(BaseCommand):
+    help = 'Moves completed and cancelled orders older than a cutoff into the archive tables, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=getattr(settings, 'ORDER_ARCHIVE_AFTER_DAYS', 180),
+                            help='Archive settled orders created more than this many days ago (default: ORDER_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Orders moved per transaction (default: 1000)')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches so other writers can get in (default: 0.1)')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches; the rest is left for the next run')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many orders would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 1:
+            raise CommandError('--older-than-days must be at least 1')
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        # Orders with feedback stay: reviews.Feedback points at them with a cascading foreign key
+        candidates = Order.objects.filter(
+            status__in=['COMPLETED', 'CANCELLED'], time_created__lt=cutoff, feedback__isnull=True
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{candidates.count()} orders created before {cutoff:%Y-%m-%d} would be archived.')
+            return
+
+        total = 0
+        batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = self.archive_batch(candidates, batch_size)
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(f'Archived {moved} orders (batch {batches})')
+            if moved < batch_size:
+                break
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} orders created before {cutoff:%Y-%m-%d}.'))
+
+    def archive_batch(self, candidates, batch_size):
+        """Copy one batch of orders with their items and payments to the archive, then delete them"""
+        with transaction.atomic():
+            orders = list(candidates.order_by('id').values(*ORDER_FIELDS)[:batch_size])
+            if not orders:
+                return 0
+            order_ids = [order['id'] for order in orders]
+            items = list(OrderItem.objects.filter(order_id__in=order_ids).values(*ITEM_FIELDS))
+            payments = list(Payment.objects.filter(order_id__in=order_ids).values(*PAYMENT_FIELDS))
+
+            ensure_archive_partitions(order['time_created'] for order in orders)
+            ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+            ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+            ArchivedPayment.objects.bulk_create([ArchivedPayment(**payment) for payment in payments])
+
+            # Children first, so deleting the orders needs no cascade lookups
+            OrderItem.objects.filter(order_id__in=order_ids).delete()
+            Payment.objects.filter(order_id__in=order_ids).delete()
+            Order.objects.filter(id__in=order_ids).delete()
+
+            for diner_id in {order['diner_id'] for order in orders}:
+                invalidate_diner_history(diner_id)
+        return len(orders)
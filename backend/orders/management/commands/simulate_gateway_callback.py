@@ -0,0 +1,46 @@
+import json
+import urllib.error
+import urllib.request
+from django.core.management.base import BaseCommand, CommandError
+from orders.models import Payment
+from orders.gateway import sign_payload
+
+
+class Command(BaseCommand):
+    help = 'Acts as a local stand-in for the online banking gateway: sends a signed settlement callback for pending payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('payment_ids', nargs='*', type=int,
+                            help='Payments to report (default: every pending ONLINE_BANKING payment)')
+        parser.add_argument('--fail', action='store_true',
+                            help='Report the transactions as failed instead of successful')
+        parser.add_argument('--url', default='http://localhost:8000/api/orders/payment/callback/',
+                            help='Callback endpoint of the running backend')
+
+    def handle(self, *args, **options):
+        payments = Payment.objects.filter(method='ONLINE_BANKING').select_related('order')
+        if options['payment_ids']:
+            payments = payments.filter(id__in=options['payment_ids'])
+        else:
+            payments = payments.filter(status='pending')
+        transactions = [{
+            "payment_id": payment.id,
+            "status": "failed" if options['fail'] else "success",
+            "amount": str(payment.order.total_price),
+        } for payment in payments]
+        if not transactions:
+            raise CommandError('No matching payments to report')
+
+        body = json.dumps({"transactions": transactions}).encode()
+        request = urllib.request.Request(options['url'], data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            'X-Gateway-Signature': sign_payload(body),
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                self.stdout.write(response.read().decode())
+        except urllib.error.HTTPError as e:
+            raise CommandError(f'Callback rejected ({e.code}): {e.read().decode()}')
+        except urllib.error.URLError as e:
+            raise CommandError(f'Could not reach {options["url"]}: {e.reason}')
+        self.stdout.write(self.style.SUCCESS(f'Reported {len(transactions)} transactions.'))
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['last_modified'], name='orders_last_modified_idx'),
+        ),
+    ]
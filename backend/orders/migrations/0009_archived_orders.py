@@ -0,0 +1,78 @@
+# Generated by Django 5.1.7 on 2026-10-17 04:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def partition_order_archive(apps, schema_editor):
+    """
+    On PostgreSQL, rebuild the order archive as a table partitioned by month
+    on time_created. Partitions are created by archive_orders as needed. The
+    primary key has to include the partition key, so it becomes (id,
+    time_created); IDs stay unique because they come from orders_order.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE TABLE orders_archivedorder_partitioned "
+        "(LIKE orders_archivedorder INCLUDING DEFAULTS) PARTITION BY RANGE (time_created)"
+    )
+    schema_editor.execute("DROP TABLE orders_archivedorder")
+    schema_editor.execute("ALTER TABLE orders_archivedorder_partitioned RENAME TO orders_archivedorder")
+    schema_editor.execute("ALTER TABLE orders_archivedorder ADD PRIMARY KEY (id, time_created)")
+    schema_editor.execute("CREATE INDEX orders_archived_created_idx ON orders_archivedorder (time_created)")
+    schema_editor.execute("CREATE INDEX orders_archived_diner_idx ON orders_archivedorder (diner_id, time_created DESC)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_name_role_index'),
+        ('menu', '0002_alter_menu_description'),
+        ('orders', '0008_order_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('service_type', models.CharField(max_length=50)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('PREPARING', 'Preparing'), ('READY', 'Ready'), ('COMPLETED', 'Completed'), ('CANCELLED', 'Cancelled')], max_length=15)),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('total_price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('time_created', models.DateTimeField()),
+                ('last_modified', models.DateTimeField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('diner', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='accounts.user')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['time_created'], name='orders_archived_created_idx'),
+                    models.Index(fields=['diner', '-time_created'], name='orders_archived_diner_idx'),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('menu_item', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='menu.menuitem')),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='order_items', to='orders.archivedorder')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('method', models.CharField(choices=[('CASH', 'Cash'), ('ONLINE_BANKING', 'Online_Banking')], max_length=20)),
+                ('time_created', models.DateTimeField()),
+                ('status', models.CharField(max_length=15)),
+                ('order', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='orders.archivedorder')),
+            ],
+        ),
+        migrations.RunPython(partition_order_archive, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.1.7 on 2026-10-17 09:12
+
+from django.db import migrations, models, transaction
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+def backfill_price_snapshots(apps, schema_editor):
+    """
+    Copy the current menu price and name onto existing lines, in id-ordered
+    batches that each commit on their own, so no long lock is held on the
+    table. Older orders get today's prices; that is the best record left.
+    """
+    db = schema_editor.connection.alias
+    MenuItem = apps.get_model('menu', 'MenuItem')
+    menu_item = MenuItem.objects.using(db).filter(id=OuterRef('menu_item_id'))
+    for model_name in ('OrderItem', 'ArchivedOrderItem'):
+        model = apps.get_model('orders', model_name)
+        last_id = 0
+        while True:
+            ids = list(model.objects.using(db).filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE])
+            if not ids:
+                break
+            with transaction.atomic(using=db):
+                model.objects.using(db).filter(id__gt=last_id, id__lte=ids[-1], unit_price__isnull=True).update(
+                    unit_price=Subquery(menu_item.values('price')[:1]),
+                    item_name=Coalesce(Subquery(menu_item.values('name')[:1]), Value('')),
+                )
+            last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits separately
+    atomic = False
+
+    dependencies = [
+        ('menu', '0002_alter_menu_description'),
+        ('orders', '0009_archived_orders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item_name',
+            field=models.CharField(default='', max_length=100),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='item_name',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.RunPython(backfill_price_snapshots, migrations.RunPython.noop),
+    ]
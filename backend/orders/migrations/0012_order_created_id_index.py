@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_orderitem_unit_price_required'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='orders_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['time_created', 'id'], name='orders_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-17 03:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_menuitem_image_variants'),
+        ('orders', '0012_order_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedorderitem',
+            name='menu_item',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='menu.menuitem'),
+        ),
+        migrations.AlterField(
+            model_name='orderitem',
+            name='menu_item',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='menu.menuitem'),
+        ),
+    ]
@@ -5,6 +5,10 @@ from django.utils import timezone
 
 # Create your models here.
 
+# Statuses shown on the kitchen board. Module level so Order.Meta can build
+# the kitchen partial index from the same list the board queries with.
+KITCHEN_STATUSES = ['PENDING', 'PREPARING', 'READY']
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -20,17 +24,53 @@ class Order(models.Model):
     diner = models.ForeignKey(User, on_delete=models.CASCADE, limit_choices_to={'role': 'Customer'})
     time_created = models.DateTimeField(default=timezone.now)
     last_modified = models.DateTimeField(auto_now=True)
+    # Bumped on every status change; staff updates only apply to the version they saw
+    version = models.PositiveIntegerField(default=0)
+
+    KITCHEN_STATUSES = KITCHEN_STATUSES
+
+    # Status changes staff may make, by current status. Active orders move
+    # freely among the kitchen statuses (the order management table toggles
+    # between them) and can be cancelled until they are completed.
+    STATUS_TRANSITIONS = {
+        'PENDING': ['PREPARING', 'READY', 'CANCELLED'],
+        'PREPARING': ['PENDING', 'READY', 'CANCELLED'],
+        'READY': ['PENDING', 'PREPARING', 'COMPLETED', 'CANCELLED'],
+        'COMPLETED': [],
+        'CANCELLED': [],
+    }
+
+    class Meta:
+        indexes = [
+            # Kitchen board: active orders oldest first. Partial, so it stays
+            # small while completed orders pile up.
+            models.Index(fields=['time_created'], name='orders_kitchen_active_idx',
+                         condition=models.Q(status__in=KITCHEN_STATUSES)),
+            # Status filters ordered by creation time
+            models.Index(fields=['status', 'time_created'], name='orders_status_created_idx'),
+            # Analytics date ranges
+            models.Index(fields=['time_created', 'id'], name='orders_created_id_idx'),
+            # Order history of one diner, newest first
+            models.Index(fields=['diner', '-time_created'], name='orders_diner_created_idx'),
+            # Kitchen board delta polling (?since=)
+            models.Index(fields=['last_modified'], name='orders_last_modified_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.pk} - {self.status}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items')
-    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE)
+    # Null once the menu item is deleted; the line keeps its name and price
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True)
     quantity = models.PositiveIntegerField(default=1) # pyright: ignore[reportArgumentType]
+    # Copied from the menu item when the line is added, so bills keep the
+    # price and name the diner ordered at after the menu changes
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2)
+    item_name = models.CharField(max_length=100)
 
     def __str__(self):
-        return f"{self.quantity} x {self.menu_item.name} for Order #{self.order.pk}"
+        return f"{self.quantity} x {self.item_name} for Order #{self.order.pk}"
 
 class Payment(models.Model):
     METHOD_CHOICES = [
@@ -43,4 +83,48 @@ class Payment(models.Model):
     status = models.CharField(max_length=15, default='unpaid')
 
     def __str__(self):
-        return f"Payment for Order #{self.order.pk} ({self.method})"
\ No newline at end of file
+        return f"Payment for Order #{self.order.pk} ({self.method})"
+
+
+# Settled orders moved out of the hot tables by `manage.py archive_orders`,
+# so kitchen, history and payment queries only scan live orders. Rows keep
+# their original IDs. References carry no database constraints: archived rows
+# never block deleting a user or menu item, and on PostgreSQL the order
+# archive is partitioned by month (see migration 0009).
+
+class ArchivedOrder(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    service_type = models.CharField(max_length=50)
+    status = models.CharField(max_length=15, choices=Order.STATUS_CHOICES)
+    note = models.CharField(max_length=200, blank=True)
+    total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    diner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    time_created = models.DateTimeField()
+    last_modified = models.DateTimeField()
+    version = models.PositiveIntegerField(default=0)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['time_created'], name='orders_archived_created_idx'),
+            models.Index(fields=['diner', '-time_created'], name='orders_archived_diner_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived order #{self.pk} - {self.status}"
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name='order_items')
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.DO_NOTHING, db_constraint=False, null=True, related_name='+')
+    quantity = models.PositiveIntegerField(default=1) # pyright: ignore[reportArgumentType]
+    # Null for lines archived before prices were recorded whose menu item is gone
+    unit_price = models.DecimalField(max_digits=8, decimal_places=2, null=True)
+    item_name = models.CharField(max_length=100, blank=True)
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    method = models.CharField(max_length=20, choices=Payment.METHOD_CHOICES)
+    time_created = models.DateTimeField()
+    status = models.CharField(max_length=15)
@@ -0,0 +1,65 @@
+import json
+import base64
+from datetime import datetime
+from django.db.models import Q
+
+
+def encode_cursor(time_created, order_id):
+    """Opaque cursor pointing just past (time_created, id)"""
+    raw = json.dumps([time_created.isoformat(), order_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        time_created, order_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(time_created), int(order_id)
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def parse_limit(value, default=50, maximum=200):
+    """Page size from a query parameter, clamped to [1, maximum]"""
+    try:
+        limit = int(value) if value else default
+    except ValueError:
+        return default
+    return max(1, min(limit, maximum))
+
+def paginate_newest_first(queryset, cursor, limit):
+    """
+    Keyset pagination over orders, newest first, ordered by (time_created, id).
+    Unlike OFFSET, each page costs the same however deep the client has paged,
+    and rows inserted meanwhile don't shift pages. `queryset` may be a values()
+    queryset but must include 'id' and 'time_created'.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    return paginate_newest_first_across([queryset], cursor, limit)
+
+def _sort_key(row):
+    if isinstance(row, dict):
+        return row['time_created'], row['id']
+    return row.time_created, row.id
+
+def paginate_newest_first_across(querysets, cursor, limit):
+    """
+    paginate_newest_first over several querysets as if they were one, e.g.
+    live and archived orders. Each is read up to one page past the cursor
+    and the results merged, so IDs must not repeat across querysets.
+    """
+    if cursor:
+        time_created, order_id = decode_cursor(cursor)
+        after_cursor = Q(time_created__lt=time_created) | Q(time_created=time_created, id__lt=order_id)
+    rows = []
+    for queryset in querysets:
+        queryset = queryset.order_by('-time_created', '-id')
+        if cursor:
+            queryset = queryset.filter(after_cursor)
+        # Fetch one extra row to learn whether another page exists
+        rows.extend(queryset[:limit + 1])
+    if len(querysets) > 1:
+        rows.sort(key=_sort_key, reverse=True)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*_sort_key(rows[-1]))
+    return rows, next_cursor
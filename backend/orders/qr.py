@@ -0,0 +1,340 @@
+import io
+import os
+import time
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from PIL import Image
+
+# Minimal QR code encoder (ISO/IEC 18004): byte mode, error correction level
+# M, versions 1-10 (up to 213 bytes), which is plenty for payment payloads.
+# Pillow only draws the result, so no extra dependency is needed.
+
+MAX_VERSION = 10
+# Per version (index 0 unused), for error correction level M
+ECC_CODEWORDS_PER_BLOCK = (None, 10, 16, 26, 18, 24, 16, 18, 22, 22, 26)
+NUM_ERROR_CORRECTION_BLOCKS = (None, 1, 1, 1, 2, 2, 4, 4, 4, 5, 5)
+ECC_LEVEL_M_FORMAT_BITS = 0
+
+MASK_PATTERNS = (
+    lambda x, y: (x + y) % 2,
+    lambda x, y: y % 2,
+    lambda x, y: x % 3,
+    lambda x, y: (x + y) % 3,
+    lambda x, y: (x // 3 + y // 2) % 2,
+    lambda x, y: x * y % 2 + x * y % 3,
+    lambda x, y: (x * y % 2 + x * y % 3) % 2,
+    lambda x, y: ((x + y) % 2 + x * y % 3) % 2,
+)
+
+
+def _get_bit(value, index):
+    return (value >> index) & 1 != 0
+
+def _num_raw_data_modules(version):
+    """Modules left for codewords once function patterns are drawn"""
+    result = (16 * version + 128) * version + 64
+    if version >= 2:
+        num_align = version // 7 + 2
+        result -= (25 * num_align - 10) * num_align - 55
+        if version >= 7:
+            result -= 36
+    return result
+
+def _num_data_codewords(version):
+    return (_num_raw_data_modules(version) // 8
+            - ECC_CODEWORDS_PER_BLOCK[version] * NUM_ERROR_CORRECTION_BLOCKS[version])
+
+def _alignment_pattern_positions(version):
+    if version == 1:
+        return []
+    num_align = version // 7 + 2
+    step = (version * 8 + num_align * 3 + 5) // (num_align * 4 - 4) * 2
+    return [6] + [version * 4 + 17 - 7 - i * step for i in range(num_align - 2, -1, -1)]
+
+
+# Reed-Solomon error correction over GF(2^8) with the QR polynomial 0x11D
+
+def _rs_multiply(x, y):
+    z = 0
+    for i in range(7, -1, -1):
+        z = (z << 1) ^ ((z >> 7) * 0x11D)
+        z ^= ((y >> i) & 1) * x
+    return z
+
+def _rs_divisor(degree):
+    result = [0] * (degree - 1) + [1]
+    root = 1
+    for _ in range(degree):
+        for j in range(degree):
+            result[j] = _rs_multiply(result[j], root)
+            if j + 1 < degree:
+                result[j] ^= result[j + 1]
+        root = _rs_multiply(root, 0x02)
+    return result
+
+def _rs_remainder(data, divisor):
+    result = [0] * len(divisor)
+    for b in data:
+        factor = b ^ result.pop(0)
+        result.append(0)
+        for i, coef in enumerate(divisor):
+            result[i] ^= _rs_multiply(coef, factor)
+    return result
+
+
+def _encode_codewords(data, version):
+    """Mode indicator, length, payload, terminator and padding, as data codewords"""
+    bits = []
+    def append(value, length):
+        bits.extend((value >> i) & 1 for i in range(length - 1, -1, -1))
+
+    capacity = _num_data_codewords(version) * 8
+    append(0b0100, 4)  # Byte mode
+    append(len(data), 8 if version < 10 else 16)
+    for b in data:
+        append(b, 8)
+    append(0, min(4, capacity - len(bits)))
+    append(0, -len(bits) % 8)
+    codewords = [int(''.join(map(str, bits[i:i + 8])), 2) for i in range(0, len(bits), 8)]
+    pad = 0xEC
+    while len(codewords) < capacity // 8:
+        codewords.append(pad)
+        pad ^= 0xEC ^ 0x11
+    return codewords
+
+def _add_ecc_and_interleave(data, version):
+    num_blocks = NUM_ERROR_CORRECTION_BLOCKS[version]
+    block_ecc_len = ECC_CODEWORDS_PER_BLOCK[version]
+    raw_codewords = _num_raw_data_modules(version) // 8
+    num_short_blocks = num_blocks - raw_codewords % num_blocks
+    short_block_len = raw_codewords // num_blocks
+
+    divisor = _rs_divisor(block_ecc_len)
+    blocks = []
+    k = 0
+    for i in range(num_blocks):
+        block = data[k:k + short_block_len - block_ecc_len + (0 if i < num_short_blocks else 1)]
+        k += len(block)
+        ecc = _rs_remainder(block, divisor)
+        if i < num_short_blocks:
+            block.append(0)  # Placeholder so all blocks line up; skipped below
+        blocks.append(block + ecc)
+
+    result = []
+    for i in range(len(blocks[0])):
+        for j, block in enumerate(blocks):
+            if i != short_block_len - block_ecc_len or j >= num_short_blocks:
+                result.append(block[i])
+    return result
+
+
+class _Symbol:
+    """Module grid of one QR symbol while it is being drawn"""
+
+    def __init__(self, version):
+        self.version = version
+        self.size = version * 4 + 17
+        self.modules = [[False] * self.size for _ in range(self.size)]
+        self.is_function = [[False] * self.size for _ in range(self.size)]
+
+    def set_function(self, x, y, dark):
+        self.modules[y][x] = dark
+        self.is_function[y][x] = True
+
+    def draw_function_patterns(self):
+        for i in range(self.size):
+            self.set_function(6, i, i % 2 == 0)
+            self.set_function(i, 6, i % 2 == 0)
+        for x, y in ((3, 3), (self.size - 4, 3), (3, self.size - 4)):
+            for dy in range(-4, 5):
+                for dx in range(-4, 5):
+                    if 0 <= x + dx < self.size and 0 <= y + dy < self.size:
+                        self.set_function(x + dx, y + dy, max(abs(dx), abs(dy)) not in (2, 4))
+        positions = _alignment_pattern_positions(self.version)
+        last = len(positions) - 1
+        for i, x in enumerate(positions):
+            for j, y in enumerate(positions):
+                if (i, j) in ((0, 0), (0, last), (last, 0)):
+                    continue  # Overlaps a finder pattern
+                for dy in range(-2, 3):
+                    for dx in range(-2, 3):
+                        self.set_function(x + dx, y + dy, max(abs(dx), abs(dy)) != 1)
+        self.draw_format_bits(0)  # Reserve the area; redrawn once the mask is chosen
+        self.draw_version()
+
+    def draw_format_bits(self, mask):
+        data = ECC_LEVEL_M_FORMAT_BITS << 3 | mask
+        rem = data
+        for _ in range(10):
+            rem = (rem << 1) ^ ((rem >> 9) * 0x537)
+        bits = (data << 10 | rem) ^ 0x5412
+        for i in range(0, 6):
+            self.set_function(8, i, _get_bit(bits, i))
+        self.set_function(8, 7, _get_bit(bits, 6))
+        self.set_function(8, 8, _get_bit(bits, 7))
+        self.set_function(7, 8, _get_bit(bits, 8))
+        for i in range(9, 15):
+            self.set_function(14 - i, 8, _get_bit(bits, i))
+        for i in range(0, 8):
+            self.set_function(self.size - 1 - i, 8, _get_bit(bits, i))
+        for i in range(8, 15):
+            self.set_function(8, self.size - 15 + i, _get_bit(bits, i))
+        self.set_function(8, self.size - 8, True)  # Always dark
+
+    def draw_version(self):
+        if self.version < 7:
+            return
+        rem = self.version
+        for _ in range(12):
+            rem = (rem << 1) ^ ((rem >> 11) * 0x1F25)
+        bits = self.version << 12 | rem
+        for i in range(18):
+            a, b = self.size - 11 + i % 3, i // 3
+            self.set_function(a, b, _get_bit(bits, i))
+            self.set_function(b, a, _get_bit(bits, i))
+
+    def draw_codewords(self, codewords):
+        i = 0
+        right = self.size - 1
+        while right >= 1:
+            if right == 6:
+                right = 5  # Skip the vertical timing pattern
+            for vert in range(self.size):
+                for j in range(2):
+                    x = right - j
+                    upward = (right + 1) & 2 == 0
+                    y = self.size - 1 - vert if upward else vert
+                    if not self.is_function[y][x] and i < len(codewords) * 8:
+                        self.modules[y][x] = _get_bit(codewords[i >> 3], 7 - (i & 7))
+                        i += 1
+            right -= 2
+
+    def apply_mask(self, mask):
+        pattern = MASK_PATTERNS[mask]
+        for y in range(self.size):
+            for x in range(self.size):
+                if not self.is_function[y][x] and pattern(x, y) == 0:
+                    self.modules[y][x] = not self.modules[y][x]
+
+    def penalty(self):
+        """Penalty rules 1, 2 and 4; lower is easier to scan"""
+        score = 0
+        lines = self.modules + [list(column) for column in zip(*self.modules)]
+        for line in lines:
+            run_color, run_length = None, 0
+            for dark in line:
+                if dark == run_color:
+                    run_length += 1
+                    score += 3 if run_length == 5 else (1 if run_length > 5 else 0)
+                else:
+                    run_color, run_length = dark, 1
+        for y in range(self.size - 1):
+            for x in range(self.size - 1):
+                if self.modules[y][x] == self.modules[y][x + 1] == self.modules[y + 1][x] == self.modules[y + 1][x + 1]:
+                    score += 3
+        total = self.size * self.size
+        dark = sum(map(sum, self.modules))
+        score += ((abs(dark * 20 - total * 10) + total - 1) // total - 1) * 10
+        return score
+
+
+def encode_qr(data):
+    """Encode bytes as a QR symbol; returns rows of booleans (True = dark)"""
+    for version in range(1, MAX_VERSION + 1):
+        if 4 + (8 if version < 10 else 16) + len(data) * 8 <= _num_data_codewords(version) * 8:
+            break
+    else:
+        raise ValueError(f"QR payload too long ({len(data)} bytes)")
+
+    symbol = _Symbol(version)
+    symbol.draw_function_patterns()
+    symbol.draw_codewords(_add_ecc_and_interleave(_encode_codewords(data, version), version))
+
+    best_mask, best_penalty = 0, None
+    for mask in range(8):
+        symbol.apply_mask(mask)
+        symbol.draw_format_bits(mask)
+        penalty = symbol.penalty()
+        if best_penalty is None or penalty < best_penalty:
+            best_mask, best_penalty = mask, penalty
+        symbol.apply_mask(mask)  # XOR again to undo
+    symbol.apply_mask(best_mask)
+    symbol.draw_format_bits(best_mask)
+    return symbol.modules
+
+def render_qr_png(data, scale=8, border=4):
+    """PNG image of `data` as a QR code, `scale` pixels per module"""
+    modules = encode_qr(data)
+    size = len(modules) + border * 2
+    image = Image.new('1', (size, size), 1)
+    pixels = image.load()
+    for y, row in enumerate(modules):
+        for x, dark in enumerate(row):
+            if dark:
+                pixels[x + border, y + border] = 0
+    image = image.resize((size * scale, size * scale), Image.NEAREST)
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+# Rendered codes are cached on disk under a keyed hash of their payload. The
+# hash is part of the image URL, so a file never changes once written and can
+# be served as immutable. Least recently used files are evicted past
+# QR_CACHE_MAX_FILES.
+
+def qr_digest(payload):
+    """Cache key and URL component for a payload; keyed, so it can't be guessed"""
+    return salted_hmac('orders.qr', payload).hexdigest()
+
+def _cache_dir():
+    return os.path.join(settings.MEDIA_ROOT, getattr(settings, 'QR_CACHE_DIR', 'qr_cache'))
+
+def qr_cache_path(digest):
+    return os.path.join(_cache_dir(), f"{digest}.png")
+
+def get_or_render_qr(payload):
+    """
+    Path of the cached QR image for `payload`, rendering it first if needed.
+    Concurrent requests for the same payload wait for a single render.
+    """
+    digest = qr_digest(payload)
+    path = qr_cache_path(digest)
+    lock_key = f"orders:qr_render:{digest}"
+    deadline = time.monotonic() + 10
+    while True:
+        if os.path.exists(path):
+            os.utime(path)  # Mark as recently used
+            return path
+        # cache.add is atomic, so only one request renders each code
+        if cache.add(lock_key, 1, 30) or time.monotonic() >= deadline:
+            break
+        time.sleep(0.05)
+
+    try:
+        if not os.path.exists(path):
+            os.makedirs(_cache_dir(), exist_ok=True)
+            # Per process and thread: a render after the lock wait times out may race another
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(render_qr_png(payload.encode()))
+            os.replace(temp_path, path)  # Readers never see a partial file
+            _evict_least_recently_used()
+    finally:
+        cache.delete(lock_key)
+    return path
+
+def _evict_least_recently_used():
+    max_files = getattr(settings, 'QR_CACHE_MAX_FILES', 2000)
+    with os.scandir(_cache_dir()) as entries:
+        files = [entry for entry in entries if entry.name.endswith('.png')]
+    if len(files) <= max_files:
+        return
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:len(files) - max_files]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass  # Evicted by another worker
@@ -0,0 +1,152 @@
+import logging
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils.http import quote_etag
+from menu.models import MenuItem
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+logger = logging.getLogger(__name__)
+
+# Rendered bills, cached under (order_id, last_modified). Every write to an
+# order bumps last_modified, so an entry never goes stale; it just stops being
+# looked up. Orders in a final status can't change any more, so their receipt
+# is also cached under the order ID alone and served without reading the order.
+# Orders moved to the archive (see archive_orders) are final, and their
+# receipts are rendered from the archive tables once the cache entry expires.
+
+RECEIPT_WIDTH = 40
+ORDER_FIELDS = ('id', 'diner_id', 'service_type', 'status', 'total_price', 'note', 'time_created', 'last_modified')
+
+
+def _receipt_key(order_id, last_modified):
+    return f"orders:receipt:{order_id}:{last_modified.timestamp():.6f}"
+
+def _final_receipt_key(order_id):
+    return f"orders:receipt_final:{order_id}"
+
+def is_final(status):
+    return not Order.STATUS_TRANSITIONS[status]
+
+def receipt_etag(receipt, fmt):
+    """Strong ETag of one rendering of a receipt"""
+    return quote_etag(f"receipt-{receipt['order_id']}-{receipt['version_token']}-{fmt}")
+
+def render_receipt_text(bill):
+    """Plain-text receipt for printing"""
+    rule = "-" * RECEIPT_WIDTH
+    lines = [
+        f"Order #{bill['order_id']}",
+        f"{bill['time_created']}  {bill['service_type']}",
+        rule,
+    ]
+    for item in bill["items"]:
+        label = f"{item['quantity']} x {item['name']}"
+        amount = f"{item['line_total'] or '':>10}"
+        lines.append(f"{label[:RECEIPT_WIDTH - len(amount) - 1]:<{RECEIPT_WIDTH - len(amount)}}{amount}")
+    lines.append(rule)
+    lines.append(f"{'TOTAL':<{RECEIPT_WIDTH - 10}}{bill['total_price']:>10}")
+    if bill["note"]:
+        lines.append(f"Note: {bill['note']}")
+    lines.append(f"Status: {bill['order_status']}")
+    return "\n".join(lines) + "\n"
+
+def _build_receipts(orders, item_model=OrderItem):
+    """
+    Receipts for order value dicts, with all their items read in one query.
+    item_model is OrderItem, or ArchivedOrderItem for archived orders.
+    """
+    items_by_order = {order['id']: [] for order in orders}
+    # A subquery rather than a join, so lines whose menu item is gone are kept
+    image = Subquery(MenuItem.objects.filter(id=OuterRef('menu_item_id')).values('image')[:1])
+    for item in (item_model.objects.filter(order_id__in=items_by_order)
+                 .values('order_id', 'menu_item_id', 'item_name', 'unit_price', 'quantity')
+                 .annotate(image=image)
+                 .order_by('id')):
+        # Archived lines may have lost their price (see ArchivedOrderItem)
+        unit_price = item["unit_price"]
+        items_by_order[item['order_id']].append({
+            "name": item["item_name"],
+            "menu_item_id": item["menu_item_id"],
+            "image": item["image"],
+            "quantity": item["quantity"],
+            "price": None if unit_price is None else str(unit_price),
+            "line_total": None if unit_price is None else str(unit_price * item["quantity"]),
+        })
+
+    receipts = []
+    for order in orders:
+        bill = {
+            "order_id": order["id"],
+            "diner_id": order["diner_id"],
+            "service_type": order["service_type"],
+            "order_status": order["status"],
+            "total_price": str(order["total_price"]),
+            "note": order["note"],
+            "time_created": order["time_created"].strftime('%Y-%m-%d %H:%M:%S'),
+            "last_modified": order["last_modified"].strftime('%Y-%m-%d %H:%M:%S'),
+            "items": items_by_order[order["id"]],
+        }
+        receipts.append({
+            "order_id": order["id"],
+            "diner_id": order["diner_id"],
+            "version_token": f"{order['last_modified'].timestamp():.6f}",
+            "bill": bill,
+            "text": render_receipt_text(bill),
+        })
+    return receipts
+
+def _store(receipt, order):
+    timeout = getattr(settings, 'RECEIPT_CACHE_TIMEOUT', 86400)
+    cache.set(_receipt_key(order["id"], order["last_modified"]), receipt, timeout)
+    if is_final(order["status"]):
+        cache.set(_final_receipt_key(order["id"]), receipt, timeout)
+
+def get_receipt(order_id):
+    """
+    The receipt of a live or archived order, or None if there is no such order.
+    A dict of order_id, diner_id, version_token, bill (the get_bill payload)
+    and text (the printable receipt).
+    """
+    receipt = cache.get(_final_receipt_key(order_id))
+    if receipt is not None:
+        return receipt
+    order = Order.objects.filter(id=order_id).values(*ORDER_FIELDS).first()
+    if order is None:
+        archived = ArchivedOrder.objects.filter(id=order_id).values(*ORDER_FIELDS).first()
+        if archived is None:
+            return None
+        receipt, = _build_receipts([archived], ArchivedOrderItem)
+        _store(receipt, archived)
+        return receipt
+    receipt = cache.get(_receipt_key(order_id, order["last_modified"]))
+    if receipt is not None:
+        return receipt
+    receipt, = _build_receipts([order])
+    _store(receipt, order)
+    return receipt
+
+def render_receipts(order_ids):
+    """Render and cache the receipts of the given orders (two queries in all)"""
+    orders = list(Order.objects.filter(id__in=order_ids).values(*ORDER_FIELDS))
+    for receipt, order in zip(_build_receipts(orders), orders):
+        _store(receipt, order)
+
+def precompute_receipts(order_ids):
+    """
+    Render receipts for orders that were just completed, once the current
+    transaction commits, so the bill fetched at the till is already cached.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+
+    def render():
+        # The status change is committed; a failed render just means the
+        # first get_bill renders it instead
+        try:
+            render_receipts(order_ids)
+        except Exception:
+            logger.exception("Could not precompute receipts for orders %s", order_ids)
+    transaction.on_commit(render)
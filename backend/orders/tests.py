@@ -0,0 +1,71 @@
+from django.test import SimpleTestCase
+from .qr import encode_qr, _encode_codewords, _rs_divisor, _rs_remainder
+
+# Byte-mode capacity at error correction level M, by version (ISO/IEC 18004 table 7)
+BYTE_CAPACITY_M = {1: 14, 2: 26, 3: 42, 4: 62, 5: 84, 6: 106, 7: 122, 8: 152, 9: 180, 10: 213}
+
+# b"PAY|1": version 1-M, mask 3, matching an independent encoder
+PAY_1_MATRIX = [
+    "#######.#.#.#.#######",
+    "#.....#.##....#.....#",
+    "#.###.#...###.#.###.#",
+    "#.###.#.#...#.#.###.#",
+    "#.###.#..###..#.###.#",
+    "#.....#..#.##.#.....#",
+    "#######.#.#.#.#######",
+    "........##.##........",
+    "#.##.###.####.#..#.##",
+    "####.#....#####...#..",
+    "#..#..##...#.......##",
+    ".....#.#####..####.#.",
+    "##..#######.#..#.##..",
+    "........##.#..#..####",
+    "#######.#.###..#.#...",
+    "#.....#.###....#####.",
+    "#.###.#...#.#####.###",
+    "#.###.#.####..#.####.",
+    "#.###.#.###.#.##..#..",
+    "#.....#..#...#.#.#..#",
+    "#######.#.#..#..###..",
+]
+
+
+def version_of(modules):
+    return (len(modules) - 17) // 4
+
+
+class QREncoderTests(SimpleTestCase):
+    def test_matrix_for_short_payload(self):
+        rows = [''.join('#' if dark else '.' for dark in row) for row in encode_qr(b"PAY|1")]
+        self.assertEqual(rows, PAY_1_MATRIX)
+
+    def test_byte_mode_codewords(self):
+        # Mode 0100, length 00000001, "A" 01000001, terminator, then 0xEC/0x11 padding
+        self.assertEqual(_encode_codewords(b"A", 1), [0x40, 0x14, 0x10] + [0xEC, 0x11] * 6 + [0xEC])
+
+    def test_reed_solomon_error_correction(self):
+        # "HELLO WORLD" at 1-M (Thonky's QR tutorial)
+        data = [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]
+        self.assertEqual(_rs_remainder(data, _rs_divisor(10)), [196, 35, 39, 119, 235, 215, 231, 226, 93, 23])
+
+    def test_version_grows_at_capacity_boundaries(self):
+        for version, capacity in BYTE_CAPACITY_M.items():
+            with self.subTest(version=version):
+                self.assertEqual(version_of(encode_qr(b"x" * capacity)), version)
+                if version < 10:
+                    self.assertEqual(version_of(encode_qr(b"x" * (capacity + 1))), version + 1)
+
+    def test_payload_too_long(self):
+        with self.assertRaises(ValueError):
+            encode_qr(b"x" * (BYTE_CAPACITY_M[10] + 1))
+
+    def test_version_information(self):
+        # Versions 7 and up carry their number, BCH coded, next to two finder patterns
+        modules = encode_qr(b"x" * BYTE_CAPACITY_M[7])
+        size = len(modules)
+        expected = 0x07C94  # Version 7 (ISO/IEC 18004 annex D)
+        for i in range(18):
+            a, b = size - 11 + i % 3, i // 3
+            with self.subTest(bit=i):
+                self.assertEqual(modules[b][a], bool(expected >> i & 1))
+                self.assertEqual(modules[a][b], bool(expected >> i & 1))
@@ -1,51 +1,39 @@
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from .models import Order, OrderItem, Payment
+from django.utils.http import parse_etags, quote_etag
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, Prefetch, F, Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from .models import Order, OrderItem, Payment, ArchivedOrder, ArchivedOrderItem
+from .idempotency import idempotent
+from .events import get_broker, publish_order_event
+from .gateway import verify_signature
+from .qr import qr_digest, get_or_render_qr
+from .receipts import get_receipt, receipt_etag, precompute_receipts
+from .history import history_page_key, get_cached_history_page, cache_history_page, invalidate_diner_history
+from .pagination import paginate_newest_first, paginate_newest_first_across, parse_limit
 from menu.models import MenuItem
 from accounts.models import User
+import re
 import json
+import math
+import time
+import asyncio
 
-# Import JWT authentication helper from accounts
-from accounts.views import get_current_user as get_user_from_jwt
-
-# Authorization helper functions
-def get_current_user(request):
-    """Get currently logged-in user, checking JWT first then session"""
-    # Try JWT first
-    user = get_user_from_jwt(request)
-    if user:
-        return user
-    
-    # Fallback to session
-    if 'staff_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['staff_id'], role__in=['Staff', 'Manager'])
-        except User.DoesNotExist:
-            return None
-    elif 'diner_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['diner_id'], role='Customer')
-        except User.DoesNotExist:
-            return None
-    return None
-
-def is_manager(user):
-    """Check if user is a Manager"""
-    return user and user.role == 'Manager'
-
-def is_staff(user):
-    """Check if user is Staff or Manager"""
-    return user and user.role in ['Staff', 'Manager']
-
-def is_customer(user):
-    """Check if user is a Customer"""
-    return user and user.role == 'Customer'
+# Shared, request-cached authentication helpers
+from accounts.auth import get_current_user, is_manager, is_staff, is_customer
 
 @csrf_exempt
 def get_order_by_id(request: HttpResponse) -> JsonResponse:
     """
-    Get specific order by ID.
+    Get specific order by ID, including orders moved to the archive.
     RBAC: Customer can view own orders, Staff/Manager can view all orders.
     """
     if request.method == "GET":
@@ -58,17 +46,20 @@ def get_order_by_id(request: HttpResponse) -> JsonResponse:
             return JsonResponse({"status": "error", "message": "order_id parameter required"}, status=400)
         
         try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
+            order_id = int(order_id)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid order_id"}, status=400)
+        order = Order.objects.filter(id=order_id).first() or ArchivedOrder.objects.filter(id=order_id).first()
+        if order is None:
             return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
         
         # RBAC: Customer can only view own orders
-        if is_customer(current_user) and order.diner.id != current_user.id:
+        if is_customer(current_user) and order.diner_id != current_user.id:
             return JsonResponse({"status": "error", "message": "Unauthorized: Can only view own orders"}, status=403)
 
         return JsonResponse({"status": "success",
                              "order_id": order.id,
-                             "diner_id": order.diner.id,
+                             "diner_id": order.diner_id,
                              "service_type": order.service_type,
                              "status": order.status,
                              "total_price": str(order.total_price),
@@ -79,10 +70,16 @@ def get_order_by_id(request: HttpResponse) -> JsonResponse:
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
 @csrf_exempt
-def get_bill(request: HttpResponse) -> JsonResponse:
+def get_bill(request: HttpResponse) -> HttpResponse:
     """
-    Get the bill for a specific order.
+    Get the bill for a specific order, as JSON or, with format=text, as a
+    printable plain-text receipt.
     RBAC: Customer can view own bills, Staff/Manager can view all bills.
+
+    Bills are rendered once per version of the order and cached (see
+    orders.receipts); completed and cancelled orders are served from the
+    cache without touching the database. Responses carry a strong ETag and
+    If-None-Match gets a 304.
     """
     if request.method == "GET":
         current_user = get_current_user(request)
@@ -92,44 +89,178 @@ def get_bill(request: HttpResponse) -> JsonResponse:
         order_id = request.GET.get("order_id")
         if not order_id:
             return JsonResponse({"status": "error", "message": "order_id parameter required"}, status=400)
-        
         try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
+            order_id = int(order_id)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid order_id"}, status=400)
+        fmt = request.GET.get("format", "json")
+        if fmt not in ("json", "text"):
+            return JsonResponse({"status": "error", "message": "format must be 'json' or 'text'"}, status=400)
+        
+        receipt = get_receipt(order_id)
+        if receipt is None:
             return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
         
         # RBAC: Customer can only view own bills
-        if is_customer(current_user) and order.diner.id != current_user.id:
+        if is_customer(current_user) and receipt["diner_id"] != current_user.id:
             return JsonResponse({"status": "error", "message": "Unauthorized: Can only view own bills"}, status=403)
 
-        order_items = list(
-            OrderItem.objects.filter(order_id=order_id)
-            .values('menu_item__id', 'menu_item__name', 'menu_item__price', 'menu_item__image', 'quantity')
-        )
-        items_data = []
-        for item in order_items:
-            items_data.append({
-                "name": item["menu_item__name"],
-                "menu_item_id": item["menu_item__id"],
-                "image": item.get("menu_item__image", None),
-                "quantity": item["quantity"],
-                "price": str(item["menu_item__price"])
-            })
-            
+        etag = receipt_etag(receipt, fmt)
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            return not_modified(etag)
+        if fmt == "text":
+            response = HttpResponse(receipt["text"], content_type="text/plain; charset=utf-8")
+        else:
+            response = JsonResponse({"status": "success", **receipt["bill"]}, status=200)
+        response["ETag"] = etag
+        return response
+    return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+        
+
+def parse_cart_ops(raw_ops):
+    """
+    Validate a list of {"op": "add"|"remove", "item_id", "quantity"} dicts.
+    Returns (ops, invalid_ops); ops holds (op, item_id, quantity) tuples.
+    """
+    ops = []
+    invalid_ops = []
+    for index, raw in enumerate(raw_ops):
+        if not isinstance(raw, dict):
+            invalid_ops.append({"index": index, "reason": "Each op must be an object"})
+            continue
+        if raw.get("op") not in ("add", "remove"):
+            invalid_ops.append({"index": index, "reason": "op must be 'add' or 'remove'"})
+            continue
+        item_id = parse_int(raw.get("item_id"))
+        quantity = parse_int(raw.get("quantity", 1))
+        if item_id is None or quantity is None:
+            invalid_ops.append({"index": index, "reason": "Invalid item ID or quantity"})
+            continue
+        if quantity <= 0:
+            invalid_ops.append({"index": index, "reason": "Quantity must be positive"})
+            continue
+        ops.append((raw["op"], item_id, quantity))
+    return ops, invalid_ops
+
+def apply_cart_ops(order, ops):
+    """
+    Apply add/remove ops to an order's lines, in order. Adds merge into the
+    item's existing line; removing at least a line's quantity deletes it.
+    Only lines that change are written, and the total is moved by the price
+    difference and saved with update_fields. Existing lines keep the price
+    they were ordered at; new lines take the current menu price.
+
+    Call inside a transaction with the order row locked (select_for_update),
+    so concurrent carts on the same order apply one after another.
+    Returns (lines, invalid_ops): lines maps menu_item_id to the OrderItem now
+    on the order. Nothing is written if any op is invalid.
+    """
+    menu_items = MenuItem.objects.in_bulk({item_id for _, item_id, _ in ops})
+    lines = {}
+    original_quantities = {}
+    to_delete = []
+    for line in order.order_items.only('id', 'order_id', 'menu_item_id', 'quantity', 'unit_price'):
+        if line.menu_item_id is None:
+            continue  # Its menu item was deleted; ops can't name it, so it stays as ordered
+        if line.menu_item_id in lines:
+            lines[line.menu_item_id].quantity += line.quantity  # Fold duplicate lines into one
+            to_delete.append(line.id)
+        else:
+            lines[line.menu_item_id] = line
+            original_quantities[line.menu_item_id] = line.quantity
+
+    delta = 0
+    invalid_ops = []
+    for index, (op, item_id, quantity) in enumerate(ops):
+        menu_item = menu_items.get(item_id)
+        if menu_item is None:
+            invalid_ops.append({"index": index, "item_id": item_id, "reason": "Menu item not found"})
+            continue
+        line = lines.get(item_id)
+        if op == "add":
+            if line is None:
+                line = lines[item_id] = OrderItem(order=order, menu_item=menu_item, quantity=0,
+                                                  unit_price=menu_item.price, item_name=menu_item.name)
+            line.quantity += quantity
+            delta += line.unit_price * quantity
+        else:
+            if line is None or line.quantity == 0:
+                invalid_ops.append({"index": index, "item_id": item_id, "reason": "Item not in order"})
+                continue
+            removed = min(quantity, line.quantity)
+            line.quantity -= removed
+            delta -= line.unit_price * removed
+    if invalid_ops:
+        return None, invalid_ops
+
+    to_update = []
+    to_create = []
+    for menu_item_id, line in list(lines.items()):
+        if line.quantity == 0:
+            if line.pk:
+                to_delete.append(line.pk)
+            del lines[menu_item_id]
+        elif not line.pk:
+            to_create.append(line)
+        elif original_quantities.get(menu_item_id) != line.quantity:
+            to_update.append(line)
+    if to_delete:
+        OrderItem.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        OrderItem.objects.bulk_update(to_update, ['quantity'])
+    if to_create:
+        OrderItem.objects.bulk_create(to_create)
+
+    order.total_price += delta
+    order.save(update_fields=['total_price', 'last_modified'])  # last_modified is set by auto_now
+    publish_order_event('order_updated', order)
+    invalidate_diner_history(order.diner_id)
+    return lines, []
+
+@csrf_exempt
+@idempotent
+def update_cart_items(request: HttpResponse) -> JsonResponse:
+    """
+    Add and remove items on the diner's own pending order in one request.
+    Body: {"order_id": 1, "ops": [{"op": "add", "item_id": 3, "quantity": 2}, ...]}
+    All ops apply in one transaction, or none do; returns the new total.
+    """
+    if "diner_id" not in request.session:
+        return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
+
+    if request.method == "POST":
+        try:
+            request_body = json.loads(request.body, parse_constant=reject_json_constant)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid JSON body"}, status=400)
+        if not isinstance(request_body, dict):
+            return JsonResponse({"status": "error", "message": "Invalid JSON body"}, status=400)
+        order_id = request_body.get("order_id")
+        raw_ops = request_body.get("ops")
+        if not order_id or not isinstance(raw_ops, list) or not raw_ops:
+            return JsonResponse({"status": "error", "message": "order_id and a non-empty ops list are required"}, status=400)
+        ops, invalid_ops = parse_cart_ops(raw_ops)
+        if invalid_ops:
+            return JsonResponse({"status": "error", "message": "Some ops are invalid", "invalid_ops": invalid_ops}, status=400)
+
+        with transaction.atomic():
+            try:
+                order = Order.objects.select_for_update().get(id=order_id, diner_id=request.session["diner_id"])
+            except (Order.DoesNotExist, ValueError, TypeError):
+                return JsonResponse({"status": "error", "message": "Order not found or not yours"}, status=404)
+            if order.status != 'PENDING':
+                return JsonResponse({"status": "error", "message": f"Order cannot be updated in '{order.status}' status"}, status=400)
+            lines, invalid_ops = apply_cart_ops(order, ops)
+            if invalid_ops:
+                return JsonResponse({"status": "error", "message": "Some ops are invalid", "invalid_ops": invalid_ops}, status=400)
+
         return JsonResponse({
             "status": "success",
             "order_id": order.id,
-            "diner_id": order.diner.id,
-            "service_type": order.service_type,
-            "order_status": order.status,
-            "total_price": str(order.total_price),
-            "note": order.note,
-            "time_created": order.time_created.strftime('%Y-%m-%d %H:%M:%S'),
-            "last_modified": order.last_modified.strftime('%Y-%m-%d %H:%M:%S'),
-            "items": items_data
-        }, status=200)
+            "total_price": order.total_price,
+            "items": [{"item_id": menu_item_id, "quantity": line.quantity} for menu_item_id, line in lines.items()]
+        })
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
-        
 
 @csrf_exempt
 def add_order_item(request: HttpResponse) -> JsonResponse:
@@ -145,26 +276,19 @@ def add_order_item(request: HttpResponse) -> JsonResponse:
         order_id = request.POST.get("order_id")
         item_id = request.POST.get("item_id")
         item_quantity = request.POST.get("quantity")
-        
-        try:
-            order = Order.objects.get(id=order_id)
+
+        ops, invalid_ops = parse_cart_ops([{"op": "add", "item_id": item_id, "quantity": item_quantity}])
+        if invalid_ops:
+            return JsonResponse({"status": "error", "message": "Invalid item ID or quantity"})
+        with transaction.atomic():
             try:
-                menu_item = MenuItem.objects.get(id=item_id)
-            except MenuItem.DoesNotExist:
+                order = Order.objects.select_for_update().get(id=order_id)
+            except (Order.DoesNotExist, ValueError):
+                return JsonResponse({"status": "error", "message": "Order not found"})
+            lines, invalid_ops = apply_cart_ops(order, ops)
+            if invalid_ops:
                 return JsonResponse({"status": "error", "message": "Menu item not found"}, status=404)
-            # Create a new OrderItem instance
-            order_item = OrderItem(
-                order=order,
-                menu_item=menu_item,
-                quantity=item_quantity,
-            )
-            order_item.save()
-            order.total_price += menu_item.price * int(item_quantity)
-            order.last_modified = timezone.now()
-            order.save()
-            return JsonResponse({"status": "success", "item": order_item.id, "order": order.id})
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found"})
+        return JsonResponse({"status": "success", "item": lines[ops[0][1]].id, "order": order.id})
     return JsonResponse({"status": "error", "message": "Invalid request method"})
 
 @csrf_exempt
@@ -181,29 +305,19 @@ def remove_order_item(request: HttpResponse) -> JsonResponse:
         item_id = request.POST.get("item_id")  # Changed from item_name to item_id
         quantity = request.POST.get("quantity")
         
-        try:
-            quantity = int(quantity)
-        except (TypeError, ValueError):
+        ops, invalid_ops = parse_cart_ops([{"op": "remove", "item_id": item_id, "quantity": quantity}])
+        if invalid_ops:
             return JsonResponse({"status": "error", "message": "Invalid quantity"})
 
-        try: 
-            order = Order.objects.get(id=order_id)
+        with transaction.atomic():
             try:
-                order_item = OrderItem.objects.get(menu_item__id=item_id, order=order)
-                if order_item.quantity <= quantity:
-                    order.total_price -= order_item.menu_item.price * order_item.quantity
-                    order_item.delete()
-                else:
-                    order_item.quantity -= quantity
-                    order.total_price -= order_item.menu_item.price * quantity
-                    order_item.save()
-                order.last_modified = timezone.now()
-                order.save()
-                return JsonResponse({"status": "success"})
-            except OrderItem.DoesNotExist:
+                order = Order.objects.select_for_update().get(id=order_id)
+            except (Order.DoesNotExist, ValueError):
+                return JsonResponse({"status": "error", "message": "Order not found"})
+            _, invalid_ops = apply_cart_ops(order, ops)
+            if invalid_ops:
                 return JsonResponse({"status": "error", "message": "Item not found"})
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found"})
+        return JsonResponse({"status": "success"})
     return JsonResponse({"status": "error", "message": "Invalid request method"})
 
 @csrf_exempt
@@ -221,7 +335,9 @@ def add_note(request: HttpResponse) -> JsonResponse:
         try:
             order = Order.objects.get(id=order_id)
             order.note = note  # Using field 'note' on Order as defined in the model
-            order.save()
+            # Only the note: a full save would write back a status loaded
+            # before a concurrent versioned status change
+            order.save(update_fields=['note', 'last_modified'])
             return JsonResponse({"status": "success"})
         except Order.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Order not found"})
@@ -242,16 +358,63 @@ def choose_service(request: HttpResponse) -> JsonResponse:
         try:
             order = Order.objects.get(id=order_id)
             order.service_type = service_options
-            order.save()
+            order.save(update_fields=['service_type', 'last_modified'])
             return JsonResponse({"status": "success"})
         except Order.DoesNotExist:
             return JsonResponse({"status": "error", "message": "Order not found"})
     return JsonResponse({"status": "error", "message": "Invalid request method"})
 
+def reject_json_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+def parse_int(value):
+    """
+    An int from a JSON integer or a string of digits (form fields); None for
+    anything else, e.g. floats, booleans, objects or "Infinity".
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and re.fullmatch(r'\s*[-+]?\d+\s*', value):
+        return int(value)
+    return None
+
+def resolve_order_lines(item_ids, quantities):
+    """
+    Resolve requested menu item IDs and quantities in a single query.
+    Returns (lines, invalid_items): lines is a list of (MenuItem, quantity)
+    in request order, invalid_items describes every line that was rejected.
+    """
+    parsed = []
+    invalid_items = []
+    for item_id, qty in zip(item_ids, quantities):
+        parsed_id, parsed_qty = parse_int(item_id), parse_int(qty)
+        if parsed_id is None or parsed_qty is None:
+            invalid_items.append({"item_id": item_id, "quantity": qty, "reason": "Invalid item ID or quantity"})
+            continue
+        item_id, qty = parsed_id, parsed_qty
+        if qty <= 0:
+            invalid_items.append({"item_id": item_id, "quantity": qty, "reason": "Quantity must be positive"})
+            continue
+        parsed.append((item_id, qty))
+
+    menu_items = MenuItem.objects.in_bulk({item_id for item_id, _ in parsed})
+    lines = []
+    for item_id, qty in parsed:
+        menu_item = menu_items.get(item_id)
+        if menu_item is None:
+            invalid_items.append({"item_id": item_id, "quantity": qty, "reason": "Menu item not found"})
+        else:
+            lines.append((menu_item, qty))
+    return lines, invalid_items
+
 @csrf_exempt
+@idempotent
 def submit_order(request: HttpResponse) -> JsonResponse:
     """
-    Submit the order for processing
+    Submit the order for processing.
+    All menu items are resolved in one query and the order with all of its
+    lines is written in a single transaction. If any line is invalid nothing
+    is written and every invalid line is reported.
     """
     # Protect view
     # print(request.session)
@@ -259,42 +422,55 @@ def submit_order(request: HttpResponse) -> JsonResponse:
     #     return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
         
     if request.method == "POST":
-        request_body = json.loads(request.body)
+        try:
+            # NaN and Infinity are not JSON and would be echoed back in error reports
+            request_body = json.loads(request.body, parse_constant=reject_json_constant)
+        except ValueError:  # Also covers JSONDecodeError and undecodable bytes
+            return JsonResponse({"status": "error", "message": "Invalid JSON body"}, status=400)
+        if not isinstance(request_body, dict):
+            return JsonResponse({"status": "error", "message": "Request body must be a JSON object"}, status=400)
         diner_id = request_body.get("diner_id")
         service_type = request_body.get("service_type", "Dine-in")  # default to Dine-in
         note = request_body.get("note", "")
         # address = request.POST.get("address", "")  # Optional, for delivery orders
-        ordered_items = request_body.get("ordered_items")  # expecting list of item IDs
-        quantities = request_body.get("quantities")         # matching list of quantities
-        assert len(ordered_items) == len(quantities) and len(ordered_items) > 0, "Items and quantities mismatch or empty"
+        ordered_items = request_body.get("ordered_items") or []  # expecting list of item IDs
+        quantities = request_body.get("quantities") or []         # matching list of quantities
+        if not isinstance(ordered_items, list) or not isinstance(quantities, list):
+            return JsonResponse({"status": "error", "message": "ordered_items and quantities must be lists"}, status=400)
+        if not isinstance(service_type, str) or not isinstance(note, str):
+            return JsonResponse({"status": "error", "message": "service_type and note must be strings"}, status=400)
+        if len(ordered_items) != len(quantities) or len(ordered_items) == 0:
+            return JsonResponse({"status": "error", "message": "Items and quantities mismatch or empty"}, status=400)
         
         try:
             diner = User.objects.get(id=diner_id, role='Customer')
-        except User.DoesNotExist:
+        except (User.DoesNotExist, ValueError, TypeError):
             return JsonResponse({"status": "error", "message": "Diner not found"})
         
-        # Create the new order (status defaults to 'PENDING')
-        new_order = Order.objects.create(
-            diner=diner,
-            service_type=service_type,
-            note=note
-        )
+        lines, invalid_items = resolve_order_lines(ordered_items, quantities)
+        if invalid_items:
+            return JsonResponse({
+                "status": "error",
+                "message": "Some ordered items are invalid",
+                "invalid_items": invalid_items
+            }, status=400)
         
-        total_price = 0
-        for item_id, qty in zip(ordered_items, quantities):
-            try:
-                menu_item = MenuItem.objects.get(id=item_id)
-            except MenuItem.DoesNotExist:
-                continue # Or handle error: return JsonResponse({"status": "error", "message": f"Menu item with id {item_id} not found"}, status=400)
-            OrderItem.objects.create(
-                order=new_order,
-                menu_item=menu_item,
-                quantity=int(qty)
+        total_price = sum(menu_item.price * qty for menu_item, qty in lines)
+        with transaction.atomic():
+            # Create the new order (status defaults to 'PENDING')
+            new_order = Order.objects.create(
+                diner=diner,
+                service_type=service_type,
+                note=note,
+                total_price=total_price
             )
-            total_price += menu_item.price * int(qty)
-        
-        new_order.total_price = total_price
-        new_order.save()
+            OrderItem.objects.bulk_create([
+                OrderItem(order=new_order, menu_item=menu_item, quantity=qty,
+                          unit_price=menu_item.price, item_name=menu_item.name)
+                for menu_item, qty in lines
+            ])
+            publish_order_event('order_created', new_order)
+            invalidate_diner_history(diner.id)
         
         return JsonResponse({
             "status": "success",
@@ -303,11 +479,57 @@ def submit_order(request: HttpResponse) -> JsonResponse:
         })
     return JsonResponse({"status": "error", "message": "Invalid request method"})
 
+def sync_order_lines(order, lines):
+    """
+    Make the order's items match `lines` (a list of (MenuItem, quantity)),
+    touching only the rows that change: new items are bulk inserted, changed
+    quantities bulk updated and dropped items deleted. Repeated menu items are
+    merged into one line. Kept lines keep the price they were ordered at.
+    Returns the new total price. Call inside a transaction.
+    """
+    desired = {}
+    for menu_item, qty in lines:
+        if menu_item.id in desired:
+            desired[menu_item.id][1] += qty
+        else:
+            desired[menu_item.id] = [menu_item, qty]
+
+    to_update = []
+    to_delete = []
+    kept = set()
+    total_price = 0
+    for order_item in order.order_items.only('id', 'order_id', 'menu_item_id', 'quantity', 'unit_price'):
+        wanted = desired.get(order_item.menu_item_id)
+        if wanted is None or order_item.menu_item_id in kept:
+            to_delete.append(order_item.id)  # Dropped item, or a duplicate line of one we keep
+            continue
+        kept.add(order_item.menu_item_id)
+        total_price += order_item.unit_price * wanted[1]
+        if order_item.quantity != wanted[1]:
+            order_item.quantity = wanted[1]
+            to_update.append(order_item)
+
+    if to_delete:
+        OrderItem.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        OrderItem.objects.bulk_update(to_update, ['quantity'])
+    to_create = [
+        OrderItem(order=order, menu_item=menu_item, quantity=qty,
+                  unit_price=menu_item.price, item_name=menu_item.name)
+        for menu_item_id, (menu_item, qty) in desired.items()
+        if menu_item_id not in kept
+    ]
+    if to_create:
+        OrderItem.objects.bulk_create(to_create)
+
+    return total_price + sum(line.unit_price * line.quantity for line in to_create)
+
 @csrf_exempt
 def update_order(request: HttpResponse) -> JsonResponse:
     """
     Update the order details (e.g. items, quantities, note) by a diner before it's processed.
     Assumes the order status allows modification (e.g., 'PENDING').
+    Only the lines that actually change are written, all in one transaction.
     """
     if "diner_id" not in request.session:
         return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
@@ -323,43 +545,43 @@ def update_order(request: HttpResponse) -> JsonResponse:
         if len(updated_items_ids) != len(updated_quantities):
             return JsonResponse({"status": "error", "message": "Items and quantities mismatch"}, status=400)
 
-        try:
-            order = Order.objects.get(id=order_id, diner_id=request.session["diner_id"])
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found or not yours"}, status=404)
-
-        # Basic check if order can be updated (e.g., only if PENDING)
-        if order.status != 'PENDING':
-            return JsonResponse({"status": "error", "message": f"Order cannot be updated in '{order.status}' status"}, status=400)
-        
-        # Clear existing items for simplicity, or implement more complex diff logic
-        order.order_items.all().delete()
-        
-        new_total_price = 0
+        # Lines with zero or negative quantity are removed from the order
+        requested = []
         for item_id, qty_str in zip(updated_items_ids, updated_quantities):
             try:
-                quantity = int(qty_str)
-                if quantity <= 0:
-                    continue # Skip items with zero or negative quantity
-                menu_item = MenuItem.objects.get(id=item_id)
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=menu_item,
-                    quantity=quantity
-                )
-                new_total_price += menu_item.price * quantity
-            except MenuItem.DoesNotExist:
-                # Rollback or decide handling: for now, skip unknown items
-                # For a transactional approach, consider `django.db.transaction.atomic`
-                return JsonResponse({"status": "error", "message": f"Menu item with id {item_id} not found, update failed."}, status=400)
+                if int(qty_str) <= 0:
+                    continue
             except ValueError:
                 return JsonResponse({"status": "error", "message": f"Invalid quantity for item id {item_id}"}, status=400)
-        
-        order.total_price = new_total_price
-        if updated_note is not None:
-            order.note = updated_note
-        order.last_modified = timezone.now()
-        order.save()
+            requested.append((item_id, qty_str))
+
+        lines, invalid_items = resolve_order_lines([item_id for item_id, _ in requested], [qty for _, qty in requested])
+        if invalid_items:
+            return JsonResponse({
+                "status": "error",
+                "message": "Some items are invalid, update failed.",
+                "invalid_items": invalid_items
+            }, status=400)
+
+        with transaction.atomic():
+            try:
+                # Lock the order so concurrent edits of the same cart apply one after another
+                order = Order.objects.select_for_update().get(id=order_id, diner_id=request.session["diner_id"])
+            except (Order.DoesNotExist, ValueError):
+                return JsonResponse({"status": "error", "message": "Order not found or not yours"}, status=404)
+
+            # Basic check if order can be updated (e.g., only if PENDING)
+            if order.status != 'PENDING':
+                return JsonResponse({"status": "error", "message": f"Order cannot be updated in '{order.status}' status"}, status=400)
+
+            order.total_price = sync_order_lines(order, lines)
+            update_fields = ['total_price', 'last_modified']
+            if updated_note is not None:
+                order.note = updated_note
+                update_fields.append('note')
+            order.save(update_fields=update_fields)  # last_modified is set by auto_now
+            publish_order_event('order_updated', order)
+            invalidate_diner_history(order.diner_id)
         
         return JsonResponse({
             "status": "success", 
@@ -369,34 +591,74 @@ def update_order(request: HttpResponse) -> JsonResponse:
         })
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+def order_status_etag(order_id, last_modified):
+    """Every write to an order bumps last_modified, so it identifies the status payload"""
+    return quote_etag(f"{order_id}-{encode_time_cursor(last_modified)}")
+
+def not_modified(etag):
+    response = HttpResponse(status=304)
+    response["ETag"] = etag
+    return response
+
 @csrf_exempt
-def get_order_status(request: HttpResponse) -> JsonResponse:
+def get_order_status(request: HttpResponse) -> HttpResponse:
     """
     Get the status and details of a specific order.
     Diners can only see their own orders. Staff might see any.
+
+    Responses carry an ETag; a request whose If-None-Match still matches gets
+    an empty 304 after a single-column lookup. With `wait=<seconds>` as well,
+    the request is held (up to ORDER_STATUS_MAX_WAIT) until the order changes
+    and then answered with the new payload, or with a 304 on timeout.
     """
     if "diner_id" in request.session:
-        try:
-            order_id = request.GET.get("order_id")
-            if not order_id:
-                return JsonResponse({"status": "error", "message": "Order ID is required"}, status=400)
-            order = Order.objects.get(id=order_id, diner_id=request.session["diner_id"])
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found or not authorized"}, status=404)
+        orders = Order.objects.filter(diner_id=request.session["diner_id"])
+        not_found_message = "Order not found or not authorized"
     elif "staff_id" in request.session: # Assuming staff can view any order
-        try:
-            order_id = request.GET.get("order_id")
-            if not order_id:
-                return JsonResponse({"status": "error", "message": "Order ID is required"}, status=400)
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
+        orders = Order.objects.all()
+        not_found_message = "Order not found"
     else:
         return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
 
     if request.method == "GET":
-        order_items = list(order.order_items.values('menu_item__name', 'quantity', 'menu_item__price'))
-        return JsonResponse({
+        try:
+            order_id = int(request.GET.get("order_id", ""))
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Order ID is required"}, status=400)
+        try:
+            wait = float(request.GET.get("wait", 0))
+        except ValueError:
+            wait = math.nan
+        # float() also accepts nan and inf; a nan deadline would never expire
+        if not math.isfinite(wait):
+            return JsonResponse({"status": "error", "message": "wait must be a number of seconds"}, status=400)
+        wait = max(0.0, min(wait, settings.ORDER_STATUS_MAX_WAIT))
+        if_none_match = parse_etags(request.META.get("HTTP_IF_NONE_MATCH", ""))
+        orders = orders.filter(id=order_id)
+
+        with get_broker().watch(order_id) as changed:
+            deadline = time.monotonic() + wait
+            while True:
+                last_modified = orders.values_list("last_modified", flat=True).first()
+                if last_modified is None:
+                    return JsonResponse({"status": "error", "message": not_found_message}, status=404)
+                etag = order_status_etag(order_id, last_modified)
+                if etag not in if_none_match:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return not_modified(etag)
+                # Re-read after waking or timing out; writes that publish no event still count
+                changed.wait(remaining)
+                changed.clear()
+
+        order = orders.get()
+        order_items = [{
+            "menu_item__name": item["item_name"],
+            "quantity": item["quantity"],
+            "menu_item__price": item["unit_price"],
+        } for item in order.order_items.values('item_name', 'quantity', 'unit_price')]
+        response = JsonResponse({
             "status": "success",
             "order_id": order.id,
             "order_status": order.status,
@@ -407,13 +669,62 @@ def get_order_status(request: HttpResponse) -> JsonResponse:
             "last_modified": order.last_modified.strftime('%Y-%m-%d %H:%M:%S'),
             "items": order_items
         })
+        response["ETag"] = order_status_etag(order.id, order.last_modified)
+        return response
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+# Most orders one bulk status request may move
+MAX_BULK_STATUS_ORDERS = 200
+
+def transition_orders(rows, new_status):
+    """
+    Move orders to `new_status` with one conditional UPDATE, each row only if
+    its version is still the one in `rows` (dicts of id, status, version and
+    diner_id, already checked against Order.STATUS_TRANSITIONS). Rows another
+    request changed in the meantime are left alone.
+    Returns the rows that were updated.
+    """
+    if not rows:
+        return []
+    now = timezone.now()
+    condition = Q()
+    for row in rows:
+        condition |= Q(id=row['id'], version=row['version'])
+    count = Order.objects.filter(condition).update(status=new_status, version=F('version') + 1, last_modified=now)
+    updated = rows
+    if count != len(rows):
+        # Lost some races; find out which rows carry our write
+        current = Order.objects.filter(id__in=[row['id'] for row in rows]).in_bulk()
+        updated = [row for row in rows
+                   if row['id'] in current
+                   and current[row['id']].version == row['version'] + 1
+                   and current[row['id']].last_modified == now]
+
+    for row in updated:
+        order = Order(id=row['id'], diner_id=row['diner_id'], status=new_status, version=row['version'] + 1, last_modified=now)
+        publish_order_event('order_status_changed', order, previous_status=row['status'])
+        invalidate_diner_history(row['diner_id'])
+    if new_status == 'COMPLETED':
+        precompute_receipts(row['id'] for row in updated)
+    return updated
+
+def check_transition(row, new_status, expected_version=None):
+    """Reason the row can't move to new_status, or None if it can"""
+    if expected_version is not None and expected_version != row['version']:
+        return f"Order was changed by someone else (now {row['status']}, version {row['version']})"
+    if new_status not in Order.STATUS_TRANSITIONS[row['status']]:
+        return f"Cannot change status from {row['status']} to {new_status}"
+    return None
+
 @csrf_exempt
 def update_order_status_by_staff(request: HttpResponse) -> JsonResponse:
     """
     Update the status of an order.
     RBAC: Only Staff and Manager can update order status.
+
+    Only the moves in Order.STATUS_TRANSITIONS are allowed. Pass the order's
+    `version` (from the kitchen board) to apply the change only if nobody
+    else has changed the order since; a stale version gets a 409.
     """
     if request.method == "POST":
         current_user = get_current_user(request)
@@ -426,44 +737,127 @@ def update_order_status_by_staff(request: HttpResponse) -> JsonResponse:
         if not order_id or not new_status:
             return JsonResponse({"status": "error", "message": "Missing required fields: order_id, status"}, status=400)
         
-        valid_statuses = ['PENDING', 'PREPARING', 'READY', 'COMPLETED', 'CANCELLED']
+        valid_statuses = list(Order.STATUS_TRANSITIONS)
         if new_status not in valid_statuses:
             return JsonResponse({"status": "error", "message": f"Invalid status. Must be one of: {', '.join(valid_statuses)}"}, status=400)
-        
         try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
+            version = request.POST.get("version")
+            version = int(version) if version else None
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid version"}, status=400)
+
+        try:
+            row = Order.objects.values('id', 'status', 'version', 'diner_id').get(id=order_id)
+        except (Order.DoesNotExist, ValueError):
             return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
-        
-        old_status = order.status
-        order.status = new_status
-        order.last_modified = timezone.now()
-        order.save()
+
+        reason = check_transition(row, new_status, version)
+        # A stale version or a lost race is a conflict; a disallowed move is a bad request
+        status_code = 409 if version not in (None, row['version']) else 400
+        if reason is None and not transition_orders([row], new_status):
+            reason, status_code = "Order was changed by someone else, reload and retry", 409
+        if reason:
+            return JsonResponse({
+                "status": "error",
+                "message": reason,
+                "order_id": row['id'],
+                "allowed_statuses": Order.STATUS_TRANSITIONS[row['status']]
+            }, status=status_code)
         
         return JsonResponse({
             "status": "success",
-            "message": f"Order status updated from {old_status} to {new_status}",
-            "order_id": order.id,
-            "new_status": new_status
+            "message": f"Order status updated from {row['status']} to {new_status}",
+            "order_id": row['id'],
+            "new_status": new_status,
+            "version": row['version'] + 1
         }, status=200)
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+@csrf_exempt
+def bulk_update_order_status(request: HttpResponse) -> JsonResponse:
+    """
+    Move many orders to one status, e.g. mark a batch of tickets READY.
+    RBAC: Only Staff and Manager can update order status.
+
+    Body: {"status": "READY", "order_ids": [1, 2, 3], "versions": {"1": 4}}
+    `versions` is optional, per order. Orders that can't make the move are
+    reported in `rejected`; the rest are updated with one query.
+    """
+    if request.method == "POST":
+        current_user = get_current_user(request)
+        if not is_staff(current_user):
+            return JsonResponse({"status": "error", "message": "Unauthorized: Staff access required"}, status=403)
+
+        try:
+            request_body = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"status": "error", "message": "Invalid JSON body"}, status=400)
+        new_status = request_body.get("status")
+        order_ids = request_body.get("order_ids")
+        versions = request_body.get("versions") or {}
+        if new_status not in Order.STATUS_TRANSITIONS:
+            return JsonResponse({"status": "error", "message": f"Invalid status. Must be one of: {', '.join(Order.STATUS_TRANSITIONS)}"}, status=400)
+        if not isinstance(order_ids, list) or not order_ids or not isinstance(versions, dict):
+            return JsonResponse({"status": "error", "message": "order_ids must be a non-empty list"}, status=400)
+        if len(order_ids) > MAX_BULK_STATUS_ORDERS:
+            return JsonResponse({"status": "error", "message": f"At most {MAX_BULK_STATUS_ORDERS} orders per request"}, status=400)
+        try:
+            order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+            versions = {int(order_id): int(version) for order_id, version in versions.items()}
+        except (TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "Order IDs and versions must be integers"}, status=400)
+
+        rows = {row['id']: row for row in Order.objects.filter(id__in=order_ids).values('id', 'status', 'version', 'diner_id')}
+        rejected = []
+        eligible = []
+        for order_id in order_ids:
+            row = rows.get(order_id)
+            reason = "Order not found" if row is None else check_transition(row, new_status, versions.get(order_id))
+            if reason:
+                rejected.append({"order_id": order_id, "reason": reason})
+            else:
+                eligible.append(row)
+
+        updated = transition_orders(eligible, new_status)
+        updated_ids = {row['id'] for row in updated}
+        rejected.extend({"order_id": row['id'], "reason": "Order was changed by someone else, reload and retry"}
+                        for row in eligible if row['id'] not in updated_ids)
+
+        return JsonResponse({
+            "status": "success",
+            "new_status": new_status,
+            "updated": [{"order_id": row['id'], "previous_status": row['status'], "version": row['version'] + 1} for row in updated],
+            "rejected": rejected
+        })
+    return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+def items_count_subquery(item_model=OrderItem):
+    """
+    Total quantity of one order's items, summed per listed row so a page
+    doesn't group every matching order before the LIMIT applies.
+    """
+    totals = item_model.objects.filter(order=OuterRef('pk')).values('order').annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(totals), 0)
+
 @csrf_exempt
 def get_diner_orders(request: HttpResponse) -> JsonResponse:
     """
-    Get all orders for a specific diner.
+    Get a diner's orders, newest first, one page at a time. Archived orders
+    are included, merged into the same ordering.
     Ensures the logged-in diner can only access their own orders, or staff can access.
+
+    Query parameters: diner_id (required), limit (default 50, max 200) and
+    cursor (`next_cursor` from the previous page). Pages are cached per diner
+    until one of their orders changes.
     """
     # Security check: Logged-in diner must match diner_id or be staff
     diner_id = request.GET.get("diner_id")
-    print(diner_id)
     try:
         diner_id = int(diner_id) if diner_id else None
     except ValueError:
         return JsonResponse({"status": "error", "message": "Invalid diner ID"}, status=400)
     if not diner_id:
         return JsonResponse({"status": "error", "message": "Diner ID is required"}, status=400)
-    print("Request Item:", request.session.items())
     if "diner_id" in request.session and request.session["diner_id"] == diner_id:
         pass # Diner is accessing their own orders
     elif "staff_id" in request.session:
@@ -472,30 +866,54 @@ def get_diner_orders(request: HttpResponse) -> JsonResponse:
         return JsonResponse({"status": "error", "message": "Not authorized"}, status=403)
 
     if request.method == "GET":
-        try:
-            diner = User.objects.get(id=diner_id, role='Customer')
-            orders = Order.objects.filter(diner=diner).order_by('-time_created')
-            orders_data = []
-            for order in orders:
-                items = list(order.order_items.values('menu_item__name', 'quantity', 'menu_item__price'))
-                orders_data.append({
-                    "order_id": order.id,
-                    "status": order.status,
-                    "total_price": order.total_price,
-                    "time_created": order.time_created.strftime('%Y-%m-%d %H:%M:%S'),
-                    "items_count": sum(item['quantity'] for item in items) # Example: total items
-                })
-            return JsonResponse({"status": "success", "diner_id": diner_id, "orders": orders_data})
-        except User.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Diner not found"}, status=404)
+        cursor = request.GET.get("cursor")
+        limit = parse_limit(request.GET.get("limit"))
+        cache_key = history_page_key(diner_id, cursor, limit)
+        page_data = get_cached_history_page(cache_key)
+        if page_data is None:
+            if not User.objects.filter(id=diner_id, role='Customer').exists():
+                return JsonResponse({"status": "error", "message": "Diner not found"}, status=404)
+            # One query per table: item counts are summed in the database
+            fields = ('id', 'status', 'total_price', 'time_created')
+            orders = Order.objects.filter(diner_id=diner_id).values(*fields).annotate(
+                items_count=items_count_subquery())
+            archived = ArchivedOrder.objects.filter(diner_id=diner_id).values(*fields).annotate(
+                items_count=items_count_subquery(ArchivedOrderItem))
+            try:
+                page, next_cursor = paginate_newest_first_across([orders, archived], cursor, limit)
+            except ValueError:
+                return JsonResponse({"status": "error", "message": "Invalid cursor"}, status=400)
+            page_data = {
+                "orders": [{
+                    "order_id": order["id"],
+                    "status": order["status"],
+                    "total_price": order["total_price"],
+                    "time_created": order["time_created"].strftime('%Y-%m-%d %H:%M:%S'),
+                    "items_count": order["items_count"]
+                } for order in page],
+                "next_cursor": next_cursor,
+            }
+            cache_history_page(cache_key, page_data)
+        return JsonResponse({"status": "success", "diner_id": diner_id, **page_data})
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
-@csrf_exempt
+def parse_datetime_param(value):
+    """Parse a 'YYYY-MM-DD HH:MM:SS' query parameter as an aware datetime, or None if absent"""
+    if not value:
+        return None
+    return timezone.make_aware(datetime.strptime(value, "%Y-%m-%d %H:%M:%S"))
+
 @csrf_exempt
 def get_all_orders(request: HttpResponse) -> JsonResponse:
     """
-    Get all orders. Restricted to staff members.
+    Get all orders, newest first, one page at a time. Restricted to staff members.
     Supports both JWT and session authentication.
+
+    Query parameters (all optional):
+    - limit: page size (default 50, max 200)
+    - cursor: `next_cursor` from the previous page
+    - status, service_type: exact filters
+    - start, end: time_created range, format 'YYYY-MM-DD HH:MM:SS'
     """
     user = get_current_user(request)
     
@@ -503,22 +921,83 @@ def get_all_orders(request: HttpResponse) -> JsonResponse:
         return JsonResponse({"status": "error", "message": "Not authorized. Staff access required."}, status=403)
 
     if request.method == "GET":
-        orders = Order.objects.all().order_by('-time_created')
-        orders_data = []
-        for order in orders:
-            items = list(order.order_items.values('menu_item__name', 'quantity'))
-            orders_data.append({
-                "order_id": order.id,
-                "diner_id": order.diner.id,
-                "status": order.status,
-                "service_type": order.service_type,
-                "total_price": order.total_price,
-                "time_created": order.time_created.strftime('%Y-%m-%d %H:%M:%S'),
-                "items_count": sum(item['quantity'] for item in items)
-            })
-        return JsonResponse({"status": "success", "orders": orders_data})
+        orders = Order.objects.all()
+
+        status_filter = request.GET.get("status")
+        if status_filter:
+            orders = orders.filter(status=status_filter)
+        service_type = request.GET.get("service_type")
+        if service_type:
+            orders = orders.filter(service_type=service_type)
+        try:
+            start = parse_datetime_param(request.GET.get("start"))
+            end = parse_datetime_param(request.GET.get("end"))
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid datetime format, use YYYY-MM-DD HH:MM:SS"}, status=400)
+        if start:
+            orders = orders.filter(time_created__gte=start)
+        if end:
+            orders = orders.filter(time_created__lte=end)
+
+        # One query: item counts are summed in the database, diner_id needs no join
+        orders = orders.values(
+            'id', 'diner_id', 'status', 'service_type', 'total_price', 'time_created'
+        ).annotate(items_count=items_count_subquery())
+
+        limit = parse_limit(request.GET.get("limit"))
+        try:
+            page, next_cursor = paginate_newest_first(orders, request.GET.get("cursor"), limit)
+        except ValueError:
+            return JsonResponse({"status": "error", "message": "Invalid cursor"}, status=400)
+
+        orders_data = [{
+            "order_id": order["id"],
+            "diner_id": order["diner_id"],
+            "status": order["status"],
+            "service_type": order["service_type"],
+            "total_price": order["total_price"],
+            "time_created": order["time_created"].strftime('%Y-%m-%d %H:%M:%S'),
+            "items_count": order["items_count"]
+        } for order in page]
+        return JsonResponse({"status": "success", "orders": orders_data, "next_cursor": next_cursor})
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+# Rows modified this long before a delta cursor are sent again, so writes
+# that committed late (with an older last_modified) are not missed
+KITCHEN_DELTA_OVERLAP = timedelta(seconds=2)
+
+def kitchen_orders_queryset():
+    """Orders with their diner joined and all items fetched in one extra query"""
+    return Order.objects.select_related('diner').prefetch_related(
+        Prefetch('order_items', queryset=OrderItem.objects.select_related('menu_item').only(
+            'order_id', 'quantity', 'item_name', 'menu_item__description'))
+    )
+
+def serialize_kitchen_order(order):
+    return {
+        "order_id": order.id,
+        "diner_id": order.diner.id,
+        "diner_name": order.diner.name,
+        "service_type": order.service_type,
+        "status": order.status,
+        "version": order.version,
+        "note": order.note,
+        "total_price": str(order.total_price),
+        "time_created": order.time_created.strftime('%Y-%m-%d %H:%M:%S'),
+        "items": [{
+            "menu_item__name": item.item_name,
+            "quantity": item.quantity,
+            "menu_item__description": item.menu_item.description if item.menu_item else "",
+        } for item in order.order_items.all()]
+    }
+
+def encode_time_cursor(dt):
+    """Microseconds since the epoch, as an opaque URL-safe cursor"""
+    return str(int(dt.timestamp() * 1_000_000))
+
+def decode_time_cursor(cursor):
+    return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+
 @csrf_exempt
 def get_kitchen_orders(request: HttpResponse) -> JsonResponse:
     """
@@ -526,6 +1005,11 @@ def get_kitchen_orders(request: HttpResponse) -> JsonResponse:
     Restricted to staff members.
     Supports both JWT and session authentication.
     Returns up to 100 orders by default.
+
+    Every response carries a `cursor`. Polling screens pass it back as
+    `since=<cursor>` to receive only the kitchen orders modified since then,
+    plus `removed`: IDs of orders that left the kitchen statuses. Changes
+    close to the cursor may be sent twice, so clients should upsert by order_id.
     """
     user = get_current_user(request)
     
@@ -533,6 +1017,28 @@ def get_kitchen_orders(request: HttpResponse) -> JsonResponse:
         return JsonResponse({"status": "error", "message": "Not authorized. Staff access required."}, status=403)
 
     if request.method == "GET":
+        # Taken before querying, so nothing written during this request is skipped next time
+        cursor = encode_time_cursor(timezone.now())
+        kitchen_statuses = Order.KITCHEN_STATUSES  # Matches the partial index predicate
+
+        since = request.GET.get('since')
+        if since:
+            try:
+                since_dt = decode_time_cursor(since)
+            except (ValueError, OverflowError, OSError):
+                return JsonResponse({"status": "error", "message": "Invalid since cursor"}, status=400)
+            changed = Order.objects.filter(last_modified__gte=since_dt - KITCHEN_DELTA_OVERLAP)
+            orders = kitchen_orders_queryset().filter(
+                id__in=changed.filter(status__in=kitchen_statuses).values('id')
+            ).order_by('time_created')
+            removed = list(changed.exclude(status__in=kitchen_statuses).values_list('id', flat=True))
+            return JsonResponse({
+                "status": "success",
+                "orders": [serialize_kitchen_order(order) for order in orders],
+                "removed": removed,
+                "cursor": cursor
+            })
+
         # Get limit parameter (default 100)
         try:
             limit = int(request.GET.get('limit', 100))
@@ -540,29 +1046,160 @@ def get_kitchen_orders(request: HttpResponse) -> JsonResponse:
         except ValueError:
             limit = 100
         
-        # Define kitchen-relevant statuses
-        kitchen_statuses = ['PENDING', 'PREPARING', 'READY'] 
-        orders = Order.objects.filter(status__in=kitchen_statuses).order_by('time_created')[:limit]
-        
-        orders_data = []
-        for order in orders:
-            items_details = list(order.order_items.values('menu_item__name', 'quantity', 'menu_item__description'))
-            orders_data.append({
-                "order_id": order.id,
-                "diner_id": order.diner.id,
-                "diner_name": order.diner.name,
-                "service_type": order.service_type,
-                "status": order.status,
-                "note": order.note,
-                "total_price": str(order.total_price),
-                "time_created": order.time_created.strftime('%Y-%m-%d %H:%M:%S'),
-                "items": items_details
-            })
-        return JsonResponse({"status": "success", "orders": orders_data})
+        orders = kitchen_orders_queryset().filter(status__in=kitchen_statuses).order_by('time_created')[:limit]
+        orders_data = [serialize_kitchen_order(order) for order in orders]
+        return JsonResponse({"status": "success", "orders": orders_data, "cursor": cursor})
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+# Seconds between keep-alive comments on an idle kitchen stream, so proxies
+# do not close it and dropped clients are noticed
+KITCHEN_STREAM_HEARTBEAT = 15
+
+def is_kitchen_event(event):
+    """Events for orders entering, moving within or leaving the kitchen statuses"""
+    return (event["status"] in Order.KITCHEN_STATUSES
+            or event.get("previous_status") in Order.KITCHEN_STATUSES)
+
+def format_sse(event):
+    # The event id is a kitchen cursor, so a reconnecting screen can catch up
+    # with GET /api/orders/kitchen/?since=<Last-Event-ID>
+    event_id = encode_time_cursor(datetime.fromisoformat(event["last_modified"])) if event.get("last_modified") else ""
+    return f"id: {event_id}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+# Both streams subscribe on their first iteration: a response that is never
+# iterated would otherwise leave its subscription registered
+async def kitchen_event_stream():
+    subscription = get_broker().subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await subscription.get(timeout=KITCHEN_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return  # Fell too far behind; the client reconnects and resyncs
+            if is_kitchen_event(event):
+                yield format_sse(event)
+    finally:
+        subscription.close()
+
+def kitchen_event_stream_sync():
+    """kitchen_event_stream for WSGI workers, which can't iterate async generators"""
+    # The WSGI server iterates the response in its own thread, after the
+    # view's event loop is gone, so events go to a thread-safe queue
+    subscription = get_broker().subscribe(threaded=True)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = subscription.get(timeout=KITCHEN_STREAM_HEARTBEAT)
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            if is_kitchen_event(event):
+                yield format_sse(event)
+    finally:
+        subscription.close()
+
+async def stream_kitchen_orders(request: HttpResponse) -> StreamingHttpResponse:
+    """
+    Server-Sent Events feed of kitchen order changes.
+    Restricted to staff members; supports both JWT and session authentication.
+
+    Pushes `order_created`, `order_updated` and `order_status_changed` events
+    for orders in, or leaving, the kitchen statuses as soon as the write
+    commits. Under ASGI a stream costs a coroutine; under WSGI (runserver,
+    gunicorn sync workers) it holds a worker thread for as long as the screen
+    stays connected, so size the thread pool for the number of screens.
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+    user = await sync_to_async(get_current_user)(request)
+    if not user or not is_staff(user):
+        return JsonResponse({"status": "error", "message": "Not authorized. Staff access required."}, status=403)
+
+    stream = kitchen_event_stream() if isinstance(request, ASGIRequest) else kitchen_event_stream_sync()
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Stop nginx from buffering the stream
+    return response
+
 # Payment processing views
+
+# Most payments one batch confirmation or gateway callback may settle
+MAX_BATCH_PAYMENTS = 200
+
+def complete_paid_orders(orders, now):
+    """
+    Mark locked orders (dicts of id, status, version and diner_id) COMPLETED
+    with one UPDATE, and announce the change and render their receipts once
+    the transaction commits.
+    """
+    Order.objects.filter(id__in=[order['id'] for order in orders]).update(
+        status='COMPLETED', version=F('version') + 1, last_modified=now)
+    for order in orders:
+        publish_order_event('order_status_changed', Order(
+            id=order['id'], diner_id=order['diner_id'], status='COMPLETED', version=order['version'] + 1, last_modified=now
+        ), previous_status=order['status'])
+        invalidate_diner_history(order['diner_id'])
+    precompute_receipts(order['id'] for order in orders)
+
+def settle_payments(payment_ids, amounts=None):
+    """
+    Confirm pending payments and complete their orders in one transaction:
+    payments and orders are locked, then each table gets a single UPDATE.
+    `amounts` optionally maps payment ID to the amount the gateway collected;
+    a payment whose amount differs from its order total is not settled.
+    Returns (settled, rejected), lists of dicts describing each payment.
+    """
+    now = timezone.now()
+    settled = []
+    rejected = []
+    with transaction.atomic():
+        payments = {payment['id']: payment for payment in Payment.objects.select_for_update().filter(
+            id__in=payment_ids).values('id', 'status', 'order_id')}
+        orders = {order['id']: order for order in Order.objects.select_for_update().filter(
+            id__in=[payment['order_id'] for payment in payments.values()]
+        ).values('id', 'status', 'version', 'diner_id', 'total_price')}
+
+        to_pay = []
+        to_complete = []
+        for payment_id in payment_ids:
+            payment = payments.get(payment_id)
+            order = orders.get(payment['order_id']) if payment else None
+            if payment is None or order is None:
+                rejected.append({"payment_id": payment_id, "reason": "Payment not found"})
+            elif payment['status'] == 'paid':
+                settled.append({"payment_id": payment_id, "order_id": order['id'], "already_paid": True})
+            elif order['status'] == 'CANCELLED':
+                rejected.append({"payment_id": payment_id, "reason": "Order was cancelled"})
+            elif amounts is not None and amounts.get(payment_id) != order['total_price']:
+                rejected.append({"payment_id": payment_id, "reason": f"Amount does not match order total {order['total_price']}"})
+            else:
+                to_pay.append(payment_id)
+                if order['status'] != 'COMPLETED':
+                    to_complete.append(order)
+                settled.append({"payment_id": payment_id, "order_id": order['id'], "already_paid": False})
+
+        if to_pay:
+            Payment.objects.filter(id__in=to_pay).update(status='paid')
+        if to_complete:
+            complete_paid_orders(to_complete, now)
+    return settled, rejected
+
+def parse_id_list(values):
+    """Distinct integer IDs in request order; raises ValueError on anything else"""
+    if not isinstance(values, list) or not values:
+        raise ValueError("Expected a non-empty list")
+    return list(dict.fromkeys(int(value) for value in values))
+
 @csrf_exempt
+@idempotent
 def process_payment(request: HttpResponse) -> JsonResponse:
     """
     Process payment for an order.
@@ -570,6 +1207,8 @@ def process_payment(request: HttpResponse) -> JsonResponse:
     
     If payment_method is ONLINE_BANKING, returns QR code data.
     If payment_method is CASH, marks order as paid immediately.
+    The order row is locked while its payment changes, so concurrent payment
+    attempts for one order apply one after another.
     """
     if request.method == "POST":
         current_user = get_current_user(request)
@@ -586,30 +1225,44 @@ def process_payment(request: HttpResponse) -> JsonResponse:
         if payment_method not in valid_methods:
             return JsonResponse({"status": "error", "message": f"Invalid payment method. Must be one of {valid_methods}"}, status=400)
 
-        try:
-            order = Order.objects.get(id=order_id)
-        except Order.DoesNotExist:
-            return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
-        
-        # RBAC: Customer can only pay their own orders, Staff can process any
-        if is_customer(current_user) and order.diner.id != current_user.id:
-            return JsonResponse({"status": "error", "message": "Unauthorized: Can only pay for own orders"}, status=403)
-        
-        # Validate order status
-        if order.status == 'COMPLETED':
-            return JsonResponse({"status": "error", "message": "Order already completed and paid"}, status=400)
-        if order.status == 'CANCELLED':
-            return JsonResponse({"status": "error", "message": "Cannot pay for a cancelled order"}, status=400)
-
-        # Check if payment already exists
-        if hasattr(order, 'payment') and order.payment.status == 'paid':
-            return JsonResponse({"status": "success", "message": "Order already paid"})
-
-        # Create or update payment record
-        payment, created = Payment.objects.update_or_create(
-            order=order,
-            defaults={'method': payment_method, 'status': 'pending' if payment_method == 'ONLINE_BANKING' else 'paid'}
-        )
+        with transaction.atomic():
+            try:
+                order = Order.objects.select_for_update().get(id=order_id)
+            except (Order.DoesNotExist, ValueError):
+                return JsonResponse({"status": "error", "message": "Order not found"}, status=404)
+            
+            # RBAC: Customer can only pay their own orders, Staff can process any
+            if is_customer(current_user) and order.diner_id != current_user.id:
+                return JsonResponse({"status": "error", "message": "Unauthorized: Can only pay for own orders"}, status=403)
+            
+            # Validate order status
+            if order.status == 'COMPLETED':
+                return JsonResponse({"status": "error", "message": "Order already completed and paid"}, status=400)
+            if order.status == 'CANCELLED':
+                return JsonResponse({"status": "error", "message": "Cannot pay for a cancelled order"}, status=400)
+
+            payment = Payment.objects.filter(order=order).first()
+            if payment is not None and payment.status == 'paid':
+                return JsonResponse({"status": "success", "message": "Order already paid"})
+
+            # Create or update payment record
+            payment_status = 'paid' if payment_method == 'CASH' else 'pending'
+            if payment is None:
+                payment = Payment.objects.create(order=order, method=payment_method, status=payment_status)
+            else:
+                payment.method = payment_method
+                payment.status = payment_status
+                payment.save(update_fields=['method', 'status'])
+
+            # If CASH, the order is settled right away
+            if payment_method == 'CASH':
+                previous_status = order.status
+                order.status = 'COMPLETED'
+                order.version += 1
+                order.save(update_fields=['status', 'version', 'last_modified'])
+                publish_order_event('order_status_changed', order, previous_status=previous_status)
+                invalidate_diner_history(order.diner_id)
+                precompute_receipts([order.id])
         
         response_data = {
             "status": "success",
@@ -619,29 +1272,58 @@ def process_payment(request: HttpResponse) -> JsonResponse:
             "payment_method": payment_method
         }
         
-        # If CASH, mark as paid immediately and update order status
         if payment_method == 'CASH':
-            payment.status = 'paid'
-            payment.save()
-            order.status = 'COMPLETED'
-            order.save()
             response_data["message"] = "Cash payment confirmed"
             response_data["order_status"] = "COMPLETED"
         
         # If ONLINE_BANKING, return QR code image
         elif payment_method == 'ONLINE_BANKING':
-            # Return QR code image URL
             # In production, this would integrate with actual payment gateway
-            qr_data = f"PAYMENT|ORDER:{order.id}|AMOUNT:{order.total_price}|ID:{payment.id}"
+            qr_data = payment_qr_payload(payment.id, order.id, order.total_price)
             response_data["message"] = "Scan QR code to complete payment"
             response_data["qr_code_data"] = qr_data
-            response_data["qr_code_image"] = "/media/demo_qr_code.webp"
+            # Rendered on first fetch of the image, then served from the disk cache
+            response_data["qr_code_image"] = f"/api/orders/payment/{payment.id}/qr/{qr_digest(qr_data)}.png"
             response_data["order_status"] = order.status
         
         return JsonResponse(response_data)
     
     return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
 
+def payment_qr_payload(payment_id, order_id, amount):
+    return f"PAYMENT|ORDER:{order_id}|AMOUNT:{amount}|ID:{payment_id}"
+
+@csrf_exempt
+def get_payment_qr_code(request: HttpResponse, payment_id: int, digest: str) -> HttpResponse:
+    """
+    QR code image for an online banking payment.
+    The URL carries a keyed hash of the QR payload, so it can't be guessed
+    and its content never changes: responses are cacheable forever, and the
+    image is rendered once, then served from the disk cache.
+    """
+    if request.method != "GET":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+    etag = quote_etag(digest)
+    if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+        return not_modified(etag)
+
+    payment = Payment.objects.filter(id=payment_id, method='ONLINE_BANKING').values('order_id', 'order__total_price').first()
+    if payment is None:
+        return JsonResponse({"status": "error", "message": "QR code not found"}, status=404)
+    payload = payment_qr_payload(payment_id, payment['order_id'], payment['order__total_price'])
+    # An old link (e.g. after the order total changed) no longer matches
+    if not constant_time_compare(qr_digest(payload), digest):
+        return JsonResponse({"status": "error", "message": "QR code not found"}, status=404)
+
+    try:
+        image = open(get_or_render_qr(payload), 'rb')
+    except FileNotFoundError:  # Evicted between render and open
+        image = open(get_or_render_qr(payload), 'rb')
+    response = FileResponse(image, content_type='image/png')
+    response["Cache-Control"] = "public, max-age=31536000, immutable"
+    response["ETag"] = etag
+    return response
+
 @csrf_exempt
 def confirm_payment(request: HttpResponse) -> JsonResponse:
     """
@@ -656,30 +1338,91 @@ def confirm_payment(request: HttpResponse) -> JsonResponse:
         payment_id = request.POST.get("payment_id")
         if not payment_id:
             return JsonResponse({"status": "error", "message": "Payment ID required"}, status=400)
-        
         try:
-            payment = Payment.objects.get(id=payment_id)
-        except Payment.DoesNotExist:
+            payment_id = int(payment_id)
+        except ValueError:
             return JsonResponse({"status": "error", "message": "Payment not found"}, status=404)
         
-        if payment.status == 'paid':
+        settled, rejected = settle_payments([payment_id])
+        if rejected:
+            reason = rejected[0]["reason"]
+            return JsonResponse({"status": "error", "message": reason}, status=404 if reason == "Payment not found" else 400)
+        if settled[0]["already_paid"]:
             return JsonResponse({"status": "success", "message": "Payment already confirmed"})
         
-        # Mark payment as paid
-        payment.status = 'paid'
-        payment.save()
-        
-        # Update order status
-        order = payment.order
-        order.status = 'COMPLETED'
-        order.save()
-        
         return JsonResponse({
             "status": "success",
             "message": "Payment confirmed",
-            "payment_id": payment.id,
-            "order_id": order.id,
+            "payment_id": payment_id,
+            "order_id": settled[0]["order_id"],
             "order_status": "COMPLETED"
         })
     
-    return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
\ No newline at end of file
+    return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+@csrf_exempt
+def confirm_payments_batch(request: HttpResponse) -> JsonResponse:
+    """
+    Confirm many pending payments at once, e.g. at closing time.
+    RBAC: Staff only.
+    Body: {"payment_ids": [1, 2, 3]}. Each payment is reported as settled or
+    rejected; confirming an already paid payment is not an error.
+    """
+    if request.method == "POST":
+        current_user = get_current_user(request)
+        if not is_staff(current_user):
+            return JsonResponse({"status": "error", "message": "Unauthorized: Staff access required"}, status=403)
+
+        try:
+            payment_ids = parse_id_list(json.loads(request.body).get("payment_ids"))
+        except (json.JSONDecodeError, AttributeError, TypeError, ValueError):
+            return JsonResponse({"status": "error", "message": "payment_ids must be a non-empty list of IDs"}, status=400)
+        if len(payment_ids) > MAX_BATCH_PAYMENTS:
+            return JsonResponse({"status": "error", "message": f"At most {MAX_BATCH_PAYMENTS} payments per request"}, status=400)
+
+        settled, rejected = settle_payments(payment_ids)
+        return JsonResponse({"status": "success", "settled": settled, "rejected": rejected})
+    return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+
+@csrf_exempt
+def payment_gateway_callback(request: HttpResponse) -> JsonResponse:
+    """
+    Settlement callback from the online banking gateway.
+    Authenticated by the X-Gateway-Signature header, an HMAC-SHA256 of the
+    body with PAYMENT_GATEWAY_SECRET.
+    Body: {"transactions": [{"payment_id": 1, "status": "success", "amount": "90000.00"}, ...]}
+    Successful transactions are settled in bulk; failed ones mark their
+    pending payments as failed so the diner can pay again.
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request method"}, status=405)
+    if not verify_signature(request):
+        return JsonResponse({"status": "error", "message": "Invalid signature"}, status=403)
+
+    try:
+        transactions = json.loads(request.body, parse_constant=reject_json_constant).get("transactions")
+        if not isinstance(transactions, list) or not transactions:
+            raise ValueError("Expected a non-empty list")
+        results = {}
+        for entry in transactions:
+            payment_id = parse_int(entry["payment_id"])
+            if payment_id is None:
+                raise ValueError("Invalid payment_id")
+            amount = None
+            if entry["status"] == "success":
+                amount = Decimal(str(entry.get("amount", "")))
+                # Decimal("NaN") parses, but can't be compared with the amount due
+                if not amount.is_finite():
+                    raise ValueError("Amount must be a finite number")
+            results[payment_id] = (entry["status"], amount)
+    except (json.JSONDecodeError, AttributeError, TypeError, ValueError, KeyError, ArithmeticError):
+        return JsonResponse({"status": "error", "message": "Malformed callback payload"}, status=400)
+    if len(results) > MAX_BATCH_PAYMENTS:
+        return JsonResponse({"status": "error", "message": f"At most {MAX_BATCH_PAYMENTS} transactions per callback"}, status=400)
+
+    successful = {payment_id: amount for payment_id, (status, amount) in results.items() if status == "success"}
+    failed = [payment_id for payment_id, (status, _) in results.items() if status != "success"]
+    settled, rejected = settle_payments(list(successful), amounts=successful) if successful else ([], [])
+    if failed:
+        Payment.objects.filter(id__in=failed, status='pending').update(status='failed')
+    return JsonResponse({"status": "success", "settled": settled, "rejected": rejected, "failed": failed})
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_feedback_diner'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['time_created'], name='reviews_feedback_created_idx'),
+        ),
+    ]
@@ -11,6 +11,12 @@ class Feedback(models.Model):
     comment = models.TextField(blank=True)
     time_created = models.DateTimeField(default=timezone.now)
 
+    class Meta:
+        indexes = [
+            # Rating analytics date ranges
+            models.Index(fields=['time_created'], name='reviews_feedback_created_idx'),
+        ]
+
     def __str__(self):
         diner_name = self.diner.name if self.diner else 'Anonymous'
         return f"Feedback from {diner_name} (Order #{self.order.pk if self.order else 'None'}): {self.rating}"
@@ -7,28 +7,8 @@ from accounts.models import User
 from .models import Feedback
 from .serializers import FeedbackSerializer
 
-# Authorization helper functions
-def get_current_user(request):
-    """Get currently logged-in user from session"""
-    if 'staff_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['staff_id'], role__in=['Staff', 'Manager'])
-        except User.DoesNotExist:
-            return None
-    elif 'diner_id' in request.session:
-        try:
-            return User.objects.get(id=request.session['diner_id'], role='Customer')
-        except User.DoesNotExist:
-            return None
-    return None
-
-def is_manager(user):
-    """Check if user is a Manager"""
-    return user and user.role == 'Manager'
-
-def is_customer(user):
-    """Check if user is a Customer"""
-    return user and user.role == 'Customer'
+# Shared, request-cached authentication helpers
+from accounts.auth import get_current_user, is_manager, is_customer
 
 class FeedbackViewSet(viewsets.ModelViewSet):
     queryset = Feedback.objects.all()
@@ -85,7 +65,7 @@ def submit_feedback(request: HttpResponse) -> JsonResponse:
         
         new_feedback = Feedback(
             order=order,
-            diner=current_user,
+            diner_id=current_user.id,
             rating=rating_int,
             comment=comment
         )
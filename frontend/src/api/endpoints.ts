@@ -88,6 +88,31 @@ function createFormData(data: Record<string, any>): FormData {
   return formData;
 }
 
+// Helper function to fetch every page of a cursor-paginated order list,
+// following `next_cursor` until the server reports no more pages
+async function fetchAllOrderPages(url: string): Promise<any> {
+  const orders: any[] = [];
+  let cursor: string | null = null;
+  do {
+    const separator = url.includes('?') ? '&' : '?';
+    const pageUrl = `${url}${separator}limit=200${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+    const makeRequest = () => fetch(pageUrl, {
+      method: 'GET',
+      credentials: 'include',
+      headers: getAuthHeaders(),
+    });
+
+    const response = await makeRequest();
+    const data: any = await handleResponse(response, makeRequest);
+    if (data.status !== 'success') {
+      return data;
+    }
+    orders.push(...data.orders);
+    cursor = data.next_cursor;
+  } while (cursor);
+  return { status: 'success', orders, next_cursor: null };
+}
+
 // ===========================
 // ACCOUNTS APIs
 // ===========================
@@ -420,26 +445,12 @@ export const ordersAPI = {
 
   // Get all orders for a specific diner
   getDinerOrders: async (dinerId: number) => {
-    const makeRequest = () => fetch(`${API_BASE_URL}/orders/diner/?diner_id=${dinerId}`, {
-      method: 'GET',
-      credentials: 'include',
-      headers: getAuthHeaders(),
-    });
-    
-    const response = await makeRequest();
-    return handleResponse(response, makeRequest);
+    return fetchAllOrderPages(`${API_BASE_URL}/orders/diner/?diner_id=${dinerId}`);
   },
 
   // Staff: Get all orders
   getAllOrders: async () => {
-    const makeRequest = () => fetch(`${API_BASE_URL}/orders/all/`, {
-      method: 'GET',
-      credentials: 'include',
-      headers: getAuthHeaders(),
-    });
-    
-    const response = await makeRequest();
-    return handleResponse(response, makeRequest);
+    return fetchAllOrderPages(`${API_BASE_URL}/orders/all/`);
   },
 
   // Staff: Get kitchen orders (pending orders)
@@ -138,6 +138,9 @@ export default function OrderManagementTable({ className = "" }: OrderManagement
   };
 
   const handleStatusChange = async (orderId: number, newStatus: 'PENDING' | 'PREPARING' | 'READY') => {
+    // Clicking the current status is a no-op; the server rejects same-status moves
+    if (orders.find(order => order.order_id === orderId)?.status === newStatus) return;
+
     try {
       setProcessingOrder(orderId);
       const data = await ordersAPI.updateOrderStatus(orderId, newStatus);